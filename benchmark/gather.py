@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+# measures joining of node strings on a page made of 100k text nodes,
+# time of each operation should grow linearly with size of the page
+
+import time
+import sys
+
+from reliq import reliq
+
+
+def page(count):
+    return ("<div>" + "<b>t</b>text" * (count // 2) + "</div>").encode("utf-8")
+
+
+def measure(name, func, repeat=3):
+    start = time.time()
+    for i in range(repeat):
+        func()
+    diff = (time.time() - start) / repeat
+    print("{}: {:0.3f}s".format(name, diff))
+
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+rq = reliq(page(count))
+ls = rq.filter("b")
+single = rq[0]
+
+for name, obj in (("struct", rq), ("list", ls), ("single", single)):
+    measure(name + " bytes", lambda: bytes(obj))
+    measure(name + " str", lambda: str(obj))
+    measure(name + " text", lambda: obj.text)
+    measure(name + " text_raw", lambda: obj.text_raw)
+    measure(name + " text_recursive", lambda: obj.text_recursive)
+    measure(name + " text_recursive_raw", lambda: obj.text_recursive_raw)
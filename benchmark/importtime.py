@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+# measures cold import cost of reliq and time until the first query in fresh interpreters
+# usage: importtime.py [RUNS]
+
+import subprocess
+import time
+import sys
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def measure(code):
+    times = []
+    for _ in range(runs):
+        t1 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - t1)
+    times.sort()
+    return times[len(times) // 2]
+
+
+base = measure("pass")
+cases = {
+    "import reliq": "import reliq",
+    "first query": "import reliq; reliq.reliq('<p>a</p>').search('p | \"%i\"')",
+}
+
+print("interpreter: {:.1f}ms".format(base * 1000))
+for name, code in cases.items():
+    t = measure(code)
+    print("{}: {:.1f}ms (+{:.1f}ms)".format(name, t * 1000, (t - base) * 1000))
+
+# slowest modules imported by reliq, reported by python itself
+out = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", "import reliq"],
+    stderr=subprocess.PIPE,
+    text=True,
+).stderr
+rows = []
+for line in out.splitlines()[1:]:
+    parts = line.split("|")
+    if len(parts) == 3:
+        rows.append((int(parts[1]), parts[2].rstrip()))
+rows.sort(reverse=True)
+print("\ncumulative us | module")
+for cumulative, module in rows[:10]:
+    print("{:>13} | {}".format(cumulative, module))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# compares results and times of operations with and without reliq._native extension
+# usage: native.py [FILE]
+
+import time
+import sys
+
+from reliq import reliq
+
+module = sys.modules["reliq.reliq"]
+native = module._native
+if native is None:
+    print("reliq._native is not built")
+    sys.exit(1)
+
+
+def page(count):
+    return (
+        "<div>" + '<p class="a" id=x>text<b title=t>bold</b></p>' * (count // 5) + "</div>"
+    ).encode("utf-8")
+
+
+if len(sys.argv) > 1:
+    with open(sys.argv[1], "rb") as f:
+        data = f.read()
+else:
+    data = page(200000)
+
+operations = {
+    "nodes_table": lambda: {
+        i: getattr(reliq(data).nodes_table(), i).tobytes()
+        for i in module.reliqNodesTable.columns
+    },
+    "bytes": lambda rq: bytes(rq),
+    "text": lambda rq: rq.text,
+    "text_recursive": lambda rq: rq.text_recursive,
+    "list text_recursive": lambda rq: rq.filter("p").text_recursive,
+    "attrib_values": lambda rq: rq.filter("p, b").attrib_values("class"),
+    "attribs_many": lambda rq: rq.filter("p, b").attribs_many(),
+    "attrib": lambda rq: [dict(i.attrib) for i in rq.filter("b")],
+    "descendants": lambda rq: [i.name for i in rq.descendants(True, light=True)],
+}
+
+for name, func in operations.items():
+    results = []
+    for ext in (native, None):
+        module._native = ext
+        rq = reliq(data)
+        args = () if name == "nodes_table" else (rq,)
+        start = time.time()
+        results.append(func(*args))
+        results.append(time.time() - start)
+    module._native = native
+
+    assert results[0] == results[2], name
+    print(
+        "{}: native {:0.3f}s, ctypes {:0.3f}s".format(name, results[1], results[3])
+    )
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+# compares parsing html files again with loading them from pickle
+# usage: pickling.py DIR
+
+import time
+import sys
+import os
+import pickle
+
+from reliq import reliq
+
+
+def measure(name, func, repeat=3):
+    start = time.time()
+    for i in range(repeat):
+        func()
+    diff = (time.time() - start) / repeat
+    print("{}: {:0.3f}s".format(name, diff))
+
+
+path = sys.argv[1] if len(sys.argv) > 1 else "."
+pages = []
+for i in os.listdir(path):
+    with open(os.path.join(path, i), "rb") as f:
+        pages.append(f.read())
+
+pickled = [pickle.dumps(reliq(i)) for i in pages]
+
+print("{} files, {} bytes of html, {} bytes pickled".format(
+    len(pages), sum(len(i) for i in pages), sum(len(i) for i in pickled)
+))
+measure("reparse", lambda: [reliq(i) for i in pages])
+measure("unpickle", lambda: [pickle.loads(i) for i in pickled])
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# by Dominik Stanisław Suchora <hexderm@gmail.com>
+# License: GNU GPLv3
+
+import sys
+import argparse
+
+from .reliq import reliq
+
+
+def progress_printer(every):
+    last = 0
+
+    def progress(stats):
+        nonlocal last
+        if stats.time - last < every:
+            return
+        last = stats.time
+        print(
+            "\r{} files, {} errors, {:.1f} files/s".format(
+                stats.files, stats.errors, stats.files / (stats.time or 1)
+            ),
+            end="",
+            file=sys.stderr,
+        )
+
+    return progress
+
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        prog="python -m reliq",
+        description="Executes reliq expression on every file in directory and writes results as JSON lines",
+    )
+    parser.add_argument("expression", help="expression, validated like for reliq.json()")
+    parser.add_argument("path", help="directory with html files")
+    parser.add_argument(
+        "-f",
+        "--file",
+        action="store_true",
+        help="treat expression as path to file containing it",
+    )
+    parser.add_argument(
+        "-o", "--output", metavar="FILE", help="write to FILE instead of stdout"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, help="number of threads (default: number of cpus)"
+    )
+    parser.add_argument(
+        "-W", "--window", type=int, help="number of files processed at once"
+    )
+    parser.add_argument(
+        "-u",
+        "--unordered",
+        action="store_true",
+        help="write results as soon as they're finished",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="go into subdirectories"
+    )
+    parser.add_argument(
+        "-E",
+        "--no-errors",
+        action="store_true",
+        help="don't write lines for files that failed",
+    )
+    parser.add_argument(
+        "-p", "--progress", action="store_true", help="print progress to stderr"
+    )
+    parser.add_argument(
+        "-s", "--stats", action="store_true", help="print stats to stderr at the end"
+    )
+    return parser
+
+
+def main(argv=None):
+    args = argparser().parse_args(argv)
+
+    script = args.expression
+    if args.file:
+        with open(script, "rb") as f:
+            script = f.read()
+
+    out = sys.stdout.buffer
+    if args.output is not None:
+        out = open(args.output, "wb")
+
+    try:
+        stats = reliq.extract_dir(
+            args.path,
+            script,
+            out,
+            workers=args.workers,
+            window=args.window,
+            ordered=not args.unordered,
+            recursive=args.recursive,
+            errors=not args.no_errors,
+            progress=progress_printer(1) if args.progress else None,
+        )
+    except (reliq.ScriptError, OSError) as e:
+        print("reliq: {}".format(e), file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+
+    if args.progress:
+        print(file=sys.stderr)
+    if args.stats:
+        t = stats.time or 1
+        print(
+            "{} files, {} errors, {:.3f}s, {:.1f} files/s, {:.2f} MB/s read, {:.2f} MB/s written".format(
+                stats.files,
+                stats.errors,
+                stats.time,
+                stats.files / t,
+                stats.input / t / 1e6,
+                stats.output / t / 1e6,
+            ),
+            file=sys.stderr,
+        )
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
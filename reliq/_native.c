@@ -0,0 +1,542 @@
+/*
+    by Dominik Stanisław Suchora <hexderm@gmail.com>
+    License: GNU GPLv3
+
+    Optional accelerator for loops over nodes that are otherwise done through ctypes.
+    libreliq is not linked, pointers to its functions are passed by init() from python,
+    structures mirror those defined with ctypes in reliq.py.
+*/
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+
+typedef struct {
+    const char *b;
+    size_t s;
+} reliq_cstr;
+
+typedef struct {
+    reliq_cstr all;
+    reliq_cstr tag;
+    reliq_cstr insides;
+    const void *attribs;
+    uint32_t attribsl;
+    uint32_t tag_count;
+    uint32_t text_count;
+    uint32_t comment_count;
+    uint16_t lvl;
+    uint8_t type;
+} reliq_hnode;
+
+typedef struct {
+    reliq_cstr key;
+    reliq_cstr value;
+} reliq_attrib;
+
+typedef struct {
+    reliq_cstr url;
+    reliq_cstr scheme;
+    reliq_cstr netloc;
+    reliq_cstr path;
+    reliq_cstr params;
+    reliq_cstr query;
+    reliq_cstr fragment;
+    size_t allocated;
+} reliq_url;
+
+typedef void (*chnode_conv_t)(const void *rq, const void *c, reliq_hnode *h);
+typedef void (*cattrib_conv_t)(const void *rq, const void *c, reliq_attrib *a);
+typedef void (*url_parse_t)(const char *url, size_t urll, const char *scheme, size_t schemel, bool reuse, reliq_url *dest);
+typedef void (*url_join_t)(const reliq_url *ref, const reliq_url *url, reliq_url *dest);
+typedef void (*url_free_t)(reliq_url *url);
+
+static chnode_conv_t chnode_conv = NULL;
+static cattrib_conv_t cattrib_conv = NULL;
+static url_parse_t url_parse = NULL;
+static url_join_t url_join = NULL;
+static url_free_t url_free = NULL;
+static size_t chnode_sz = 0;
+static size_t cattrib_sz = 0;
+
+#define DESC(x) ((size_t)(x).tag_count+(x).text_count+(x).comment_count)
+#define ISTEXT(x) ((x).type >= 2 && (x).type <= 4) // text, textempty or texterr
+
+static int
+initialized(void)
+{
+    if (chnode_conv && cattrib_conv && url_parse && url_join && url_free)
+        return 1;
+    PyErr_SetString(PyExc_RuntimeError,"init() wasn't called");
+    return 0;
+}
+
+static PyObject *
+native_init(PyObject *self, PyObject *args)
+{
+    unsigned long long chnode, cattrib, parse, join, free;
+    Py_ssize_t csz, asz;
+    if (!PyArg_ParseTuple(args,"KKKKKnn",&chnode,&cattrib,&parse,&join,&free,&csz,&asz))
+        return NULL;
+    chnode_conv = (chnode_conv_t)(uintptr_t)chnode;
+    cattrib_conv = (cattrib_conv_t)(uintptr_t)cattrib;
+    url_parse = (url_parse_t)(uintptr_t)parse;
+    url_join = (url_join_t)(uintptr_t)join;
+    url_free = (url_free_t)(uintptr_t)free;
+    chnode_sz = csz;
+    cattrib_sz = asz;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+native_chnode_conv(PyObject *self, PyObject *args)
+{
+    unsigned long long rq, node;
+    Py_buffer out;
+    if (!initialized() || !PyArg_ParseTuple(args,"KKw*",&rq,&node,&out))
+        return NULL;
+    if ((size_t)out.len < sizeof(reliq_hnode)) {
+        PyBuffer_Release(&out);
+        PyErr_SetString(PyExc_ValueError,"output buffer is too small");
+        return NULL;
+    }
+    chnode_conv((const void*)(uintptr_t)rq,(const void*)(uintptr_t)node,(reliq_hnode*)out.buf);
+    PyBuffer_Release(&out);
+    Py_RETURN_NONE;
+}
+
+#define TABLE_COLUMNS 12
+
+static const size_t table_itemsizes[TABLE_COLUMNS] = {
+    sizeof(uint16_t), // lvl
+    sizeof(uint8_t), // type
+    sizeof(uint32_t), // tag_count
+    sizeof(uint32_t), // text_count
+    sizeof(uint32_t), // comment_count
+    sizeof(uint32_t), // attribsl
+    sizeof(uint64_t), // all_off
+    sizeof(uint64_t), // all_len
+    sizeof(uint64_t), // tag_off
+    sizeof(uint64_t), // tag_len
+    sizeof(uint64_t), // insides_off
+    sizeof(uint64_t), // insides_len
+};
+
+static PyObject *
+native_table(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, nodesp, datap;
+    Py_ssize_t nodesl;
+    PyObject *columns;
+    Py_buffer bufs[TABLE_COLUMNS];
+    int got = 0;
+    PyObject *ret = NULL;
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKnKO",&rqp,&nodesp,&nodesl,&datap,&columns))
+        return NULL;
+
+    columns = PySequence_Fast(columns,"columns have to be a sequence");
+    if (!columns)
+        return NULL;
+    if (PySequence_Fast_GET_SIZE(columns) != TABLE_COLUMNS) {
+        PyErr_SetString(PyExc_ValueError,"wrong number of columns");
+        goto END;
+    }
+
+    for (; got < TABLE_COLUMNS; got++) {
+        if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(columns,got),&bufs[got],PyBUF_WRITABLE) != 0)
+            goto END;
+        if ((size_t)bufs[got].len < nodesl*table_itemsizes[got]) {
+            got++;
+            PyErr_SetString(PyExc_ValueError,"column is too small");
+            goto END;
+        }
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *nodes = (const char*)(uintptr_t)nodesp;
+    const char *data = (const char*)(uintptr_t)datap;
+    uint16_t *lvl = bufs[0].buf;
+    uint8_t *type = bufs[1].buf;
+    uint32_t *tag_count = bufs[2].buf;
+    uint32_t *text_count = bufs[3].buf;
+    uint32_t *comment_count = bufs[4].buf;
+    uint32_t *attribsl = bufs[5].buf;
+    uint64_t *all_off = bufs[6].buf;
+    uint64_t *all_len = bufs[7].buf;
+    uint64_t *tag_off = bufs[8].buf;
+    uint64_t *tag_len = bufs[9].buf;
+    uint64_t *insides_off = bufs[10].buf;
+    uint64_t *insides_len = bufs[11].buf;
+
+    for (Py_ssize_t i = 0; i < nodesl; i++) {
+        reliq_hnode hn = {0}; // type is a bitfield, the rest of its byte is left untouched
+        chnode_conv(rq,nodes+i*chnode_sz,&hn);
+
+        lvl[i] = hn.lvl;
+        type[i] = hn.type;
+        tag_count[i] = hn.tag_count;
+        text_count[i] = hn.text_count;
+        comment_count[i] = hn.comment_count;
+        attribsl[i] = hn.attribsl;
+
+        all_off[i] = hn.all.b-data;
+        all_len[i] = hn.all.s;
+        if (hn.tag.b) {
+            tag_off[i] = hn.tag.b-data;
+            tag_len[i] = hn.tag.s;
+        }
+        if (hn.insides.b) {
+            insides_off[i] = hn.insides.b-data;
+            insides_len[i] = hn.insides.s;
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    Py_INCREF(Py_None);
+    ret = Py_None;
+
+    END: ;
+    for (int i = 0; i < got; i++)
+        PyBuffer_Release(&bufs[i]);
+    Py_DECREF(columns);
+    return ret;
+}
+
+typedef struct {
+    reliq_cstr *b;
+    size_t size;
+    size_t len;
+} spans_t;
+
+static int
+spans_add(spans_t *spans, const reliq_cstr *s)
+{
+    if (spans->size == spans->len) {
+        size_t size = spans->len ? spans->len*2 : 64;
+        reliq_cstr *b = realloc(spans->b,size*sizeof(reliq_cstr));
+        if (!b)
+            return -1;
+        spans->b = b;
+        spans->len = size;
+    }
+    spans->b[spans->size++] = *s;
+    return 0;
+}
+
+static PyObject *
+spans_join(spans_t *spans)
+{
+    size_t len = 0;
+    for (size_t i = 0; i < spans->size; i++)
+        len += spans->b[i].s;
+
+    PyObject *ret = PyBytes_FromStringAndSize(NULL,len);
+    if (ret) {
+        char *dest = PyBytes_AS_STRING(ret);
+        for (size_t i = 0; i < spans->size; i++) {
+            memcpy(dest,spans->b[i].b,spans->b[i].s);
+            dest += spans->b[i].s;
+        }
+    }
+    free(spans->b);
+    return ret;
+}
+
+static PyObject *
+native_text(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, nodesp;
+    Py_ssize_t nodesl;
+    int recursive;
+    int err = 0;
+    spans_t spans = {0};
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKnp",&rqp,&nodesp,&nodesl,&recursive))
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *nodes = (const char*)(uintptr_t)nodesp;
+    int lvl = -1;
+    Py_ssize_t i = 0;
+    while (i < nodesl) {
+        reliq_hnode hn = {0};
+        chnode_conv(rq,nodes+i*chnode_sz,&hn);
+        if (lvl == -1)
+            lvl = hn.lvl;
+
+        if (ISTEXT(hn) && spans_add(&spans,&hn.all) != 0) {
+            err = 1;
+            break;
+        }
+
+        if (!recursive && hn.lvl == lvl+1) {
+            i += DESC(hn)+1;
+        } else
+            i++;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (err) {
+        free(spans.b);
+        return PyErr_NoMemory();
+    }
+    return spans_join(&spans);
+}
+
+static PyObject *
+native_parents(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, nodesp;
+    Py_ssize_t nodesl;
+    Py_buffer out;
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKnw*",&rqp,&nodesp,&nodesl,&out))
+        return NULL;
+    if ((size_t)out.len < (size_t)nodesl*sizeof(uint32_t)) {
+        PyBuffer_Release(&out);
+        PyErr_SetString(PyExc_ValueError,"output buffer is too small");
+        return NULL;
+    }
+    // levels are uint16_t so stack never gets deeper than that
+    uint32_t *stack = malloc(sizeof(uint32_t)*(UINT16_MAX+1));
+    if (!stack) {
+        PyBuffer_Release(&out);
+        return PyErr_NoMemory();
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *nodes = (const char*)(uintptr_t)nodesp;
+    uint32_t *parents = (uint32_t*)out.buf;
+    size_t depth = 0;
+    for (Py_ssize_t i = 0; i < nodesl; i++) {
+        reliq_hnode hn = {0};
+        chnode_conv(rq,nodes+i*chnode_sz,&hn);
+        size_t lvl = hn.lvl;
+        if (depth > lvl)
+            depth = lvl;
+        parents[i] = (lvl > 0 && depth == lvl) ? stack[depth-1] : UINT32_MAX;
+        stack[depth++] = i;
+    }
+    Py_END_ALLOW_THREADS
+
+    free(stack);
+    PyBuffer_Release(&out);
+    Py_RETURN_NONE;
+}
+
+static int
+list_add_ptr(PyObject *list, const void *ptr)
+{
+    PyObject *o = PyLong_FromUnsignedLongLong((unsigned long long)(uintptr_t)ptr);
+    if (!o)
+        return -1;
+    int r = PyList_Append(list,o);
+    Py_DECREF(o);
+    return r;
+}
+
+static PyObject *
+native_siblings(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, nodep, endp;
+    int lvl, children;
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKKip",&rqp,&nodep,&endp,&lvl,&children))
+        return NULL;
+
+    PyObject *ret = PyList_New(0);
+    if (!ret)
+        return NULL;
+
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *node = (const char*)(uintptr_t)nodep;
+    const char *end = (const char*)(uintptr_t)endp;
+    while (node < end) {
+        reliq_hnode hn = {0};
+        chnode_conv(rq,node,&hn);
+        if (hn.lvl != lvl)
+            break;
+        const char *next = node+(DESC(hn)+1)*chnode_sz;
+
+        if (!children) {
+            if (list_add_ptr(ret,node) != 0)
+                goto ERR;
+        } else for (const char *child = node+chnode_sz; child < next;) {
+            reliq_hnode chn = {0};
+            chnode_conv(rq,child,&chn);
+            if (chn.lvl != lvl+1)
+                break;
+            if (list_add_ptr(ret,child) != 0)
+                goto ERR;
+            child += (DESC(chn)+1)*chnode_sz;
+        }
+
+        node = next;
+    }
+    return ret;
+
+    ERR: ;
+    Py_DECREF(ret);
+    return NULL;
+}
+
+static PyObject *
+native_outer(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, nodesp;
+    Py_ssize_t nodesl;
+    int err = 0;
+    spans_t spans = {0};
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKn",&rqp,&nodesp,&nodesl))
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *nodes = (const char*)(uintptr_t)nodesp;
+    Py_ssize_t i = 0;
+    while (i < nodesl) {
+        reliq_hnode hn = {0};
+        chnode_conv(rq,nodes+i*chnode_sz,&hn);
+        if (spans_add(&spans,&hn.all) != 0) {
+            err = 1;
+            break;
+        }
+        i += DESC(hn)+1;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (err) {
+        free(spans.b);
+        return PyErr_NoMemory();
+    }
+    return spans_join(&spans);
+}
+
+static PyObject *
+native_attribs(PyObject *self, PyObject *args)
+{
+    unsigned long long rqp, attribsp;
+    Py_ssize_t attribsl;
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KKn",&rqp,&attribsp,&attribsl))
+        return NULL;
+
+    const void *rq = (const void*)(uintptr_t)rqp;
+    const char *attribs = (const char*)(uintptr_t)attribsp;
+
+    PyObject *ret = PyList_New(attribsl);
+    if (!ret)
+        return NULL;
+
+    for (Py_ssize_t i = 0; i < attribsl; i++) {
+        reliq_attrib a = {0};
+        cattrib_conv(rq,attribs+i*cattrib_sz,&a);
+        PyObject *t = Py_BuildValue("(y#Kn)",a.key.b,(Py_ssize_t)a.key.s,
+            (unsigned long long)(uintptr_t)a.value.b,(Py_ssize_t)a.value.s);
+        if (!t) {
+            Py_DECREF(ret);
+            return NULL;
+        }
+        PyList_SET_ITEM(ret,i,t);
+    }
+    return ret;
+}
+
+static PyObject *
+native_urljoin(PyObject *self, PyObject *args)
+{
+    unsigned long long refp;
+    PyObject *urls;
+    int raw;
+
+    if (!initialized() || !PyArg_ParseTuple(args,"KOp",&refp,&urls,&raw))
+        return NULL;
+
+    const reliq_url *ref = (const reliq_url*)(uintptr_t)refp;
+
+    urls = PySequence_Fast(urls,"urls have to be iterable");
+    if (!urls)
+        return NULL;
+    Py_ssize_t urlsl = PySequence_Fast_GET_SIZE(urls);
+    PyObject *ret = PyList_New(urlsl);
+    if (!ret)
+        goto END;
+
+    for (Py_ssize_t i = 0; i < urlsl; i++) {
+        PyObject *u = PySequence_Fast_GET_ITEM(urls,i);
+        const char *s;
+        Py_ssize_t sl;
+        if (PyBytes_Check(u)) {
+            s = PyBytes_AS_STRING(u);
+            sl = PyBytes_GET_SIZE(u);
+        } else if (PyUnicode_Check(u)) {
+            s = PyUnicode_AsUTF8AndSize(u,&sl);
+            if (!s)
+                goto ERR;
+        } else {
+            PyErr_Format(PyExc_TypeError,"expected str or bytes, got %s",Py_TYPE(u)->tp_name);
+            goto ERR;
+        }
+
+        reliq_url url = {0};
+        url_parse(s,sl,ref->scheme.b,ref->scheme.s,false,&url);
+        url_join(ref,&url,&url);
+        PyObject *r = raw ? PyBytes_FromStringAndSize(url.url.b,url.url.s)
+            : PyUnicode_DecodeUTF8(url.url.b,url.url.s,NULL);
+        url_free(&url);
+        if (!r)
+            goto ERR;
+        PyList_SET_ITEM(ret,i,r);
+    }
+
+    END: ;
+    Py_DECREF(urls);
+    return ret;
+
+    ERR: ;
+    Py_CLEAR(ret);
+    goto END;
+}
+
+static PyMethodDef native_methods[] = {
+    {"init",native_init,METH_VARARGS,"init(chnode_conv, cattrib_conv, url_parse, url_join, url_free, chnode_sz, cattrib_sz)"},
+    {"chnode_conv",native_chnode_conv,METH_VARARGS,"chnode_conv(rq, node, out)"},
+    {"table",native_table,METH_VARARGS,"table(rq, nodes, nodesl, data, columns)"},
+    {"text",native_text,METH_VARARGS,"text(rq, nodes, nodesl, recursive) -> bytes"},
+    {"parents",native_parents,METH_VARARGS,"parents(rq, nodes, nodesl, out)"},
+    {"siblings",native_siblings,METH_VARARGS,"siblings(rq, node, end, lvl, children) -> [node]"},
+    {"outer",native_outer,METH_VARARGS,"outer(rq, nodes, nodesl) -> bytes"},
+    {"attribs",native_attribs,METH_VARARGS,"attribs(rq, attribs, attribsl) -> [(key, value_ptr, value_len)]"},
+    {"urljoin",native_urljoin,METH_VARARGS,"urljoin(ref, urls, raw) -> list"},
+    {NULL,NULL,0,NULL}
+};
+
+static struct PyModuleDef native_module = {
+    PyModuleDef_HEAD_INIT,
+    "_native",
+    NULL,
+    -1,
+    native_methods
+};
+
+PyMODINIT_FUNC
+PyInit__native(void)
+{
+    PyObject *m = PyModule_Create(&native_module);
+    if (!m)
+        return NULL;
+    if (PyModule_AddIntConstant(m,"hnode_size",sizeof(reliq_hnode)) != 0
+        || PyModule_AddIntConstant(m,"attrib_size",sizeof(reliq_attrib)) != 0
+        || PyModule_AddIntConstant(m,"url_size",sizeof(reliq_url)) != 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+    return m;
+}
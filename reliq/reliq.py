@@ -2,27 +2,61 @@
 # by Dominik Stanisław Suchora <hexderm@gmail.com>
 # License: GNU GPLv3
 
+# modules that take long to import (json, pathlib, typing, concurrent.futures,
+# multiprocessing) are imported only where they're needed
+from __future__ import annotations
+
 import os
+import sys
+import time
+import weakref
 from ctypes import *
 #import ctypes.util
-import typing
-from typing import Optional, Tuple, Callable, Generator
 from enum import Flag, auto
 from itertools import chain
+from collections import deque, namedtuple, OrderedDict
+from threading import Lock
+
+import mmap as mmaplib
+from array import array
 
-import json
-from pathlib import Path
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import typing
+    from typing import Optional, Tuple, Callable, Generator
+    from pathlib import Path
+    from multiprocessing import shared_memory
+    import urllib.parse
+
+try:
+    from . import _native
+except ImportError:
+    _native = None
 
 libreliq_name = 'libreliq.so'
 libreliq_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),libreliq_name)
 if not os.path.exists(libreliq_path):
     libreliq_path = libreliq_name
-libreliq = CDLL(libreliq_path)
+
+class reliq_lib():
+    # stands for libreliq until its first use, then the library is loaded and replaces it
+    def __init__(self):
+        self.lock = Lock()
+
+    def __getattr__(self, name):
+        return getattr(load_libreliq(),name)
+
+libreliq = reliq_lib()
 
 c_uintptr = c_uint64 if sizeof(c_void_p) == 8 else c_uint32
 
 UINT32_MAX = 4294967295 # (uint32_t)-1
 
+def ispath(x) -> bool:
+    # Path objects can't exist before pathlib is imported
+    pathlib = sys.modules.get('pathlib')
+    return pathlib is not None and isinstance(x,pathlib.Path)
+
 def strconv(string, raw: bool) -> str|bytes:
     if isinstance(string,str):
         if raw:
@@ -38,33 +72,107 @@ def strconv(string, raw: bool) -> str|bytes:
 
 #cstdlib = CDLL(ctypes.util.find_library("c"))
 
+class _py_buffer_struct(Structure):
+    _fields_ = [('buf',c_void_p),
+                ('obj',c_void_p),
+                ('len',c_ssize_t),
+                ('itemsize',c_ssize_t),
+                ('readonly',c_int),
+                ('ndim',c_int),
+                ('format',c_char_p),
+                ('shape',c_void_p),
+                ('strides',c_void_p),
+                ('suboffsets',c_void_p),
+                ('internal',c_void_p)]
+
 class reliq_str():
-    def __init__(self,string: str|bytes|Path|c_void_p,size=0):
+    def __init__(self,string: str|bytes|bytearray|memoryview|Path|c_void_p,size=0):
+        self.string = None
+        self.buffer = None
+        self._memory = None
+
         if isinstance(string,str):
             string = string.encode("utf-8")
-        elif isinstance(string,Path):
+        elif ispath(string):
             string = string.read_bytes()
 
-        if isinstance(string,bytes) and size == 0:
-            size = len(string)
+        data = string
+        if isinstance(string,bytes):
+            if size == 0:
+                size = len(string)
+        elif not isinstance(string,c_void_p|int):
+            # any object supporting buffer protocol e.g. bytearray, memoryview, mmap
+            # is kept locked and used in place for the lifetime of this object
+            buffer = _py_buffer_struct()
+            pythonapi.PyObject_GetBuffer(string,byref(buffer),0) # PyBUF_SIMPLE
+            self.buffer = buffer
+            data = buffer.buf
+            size = buffer.len
 
         self.string = string
-        self.data = string
+        self.data = data
 
         self.size = size
 
+    @property
+    def view(self) -> Optional[memoryview]:
+        if self.buffer is None:
+            return None
+        return memoryview(self.string).cast('B')
+
+    def memory(self, owner=None) -> memoryview:
+        if self._memory is not None:
+            return self._memory
+        if self.buffer is not None:
+            self._memory = self.view
+            return self._memory
+        if isinstance(self.string,bytes):
+            self._memory = memoryview(self.string)
+            return self._memory
+
+        # memory is freed either by this object or by structure (owner) so they have to outlive the view
+        buf = (c_char*self.size).from_address(self.address)
+        buf.owner = (self,owner)
+        return memoryview(buf).cast('B')
+
+    def slice(self, ptr: int, size: int, owner=None) -> memoryview:
+        start = ptr-self.address
+        return self.memory(owner)[start:start+size]
+
+    def gather(self, spans: typing.Iterable[Tuple[int,int]], owner=None) -> bytes:
+        memory = self.memory(owner)
+        address = self.address
+        return b"".join([memory[i-address:i-address+size] for i, size in spans])
+
+    @property
+    def address(self) -> int:
+        data = self.data
+        if isinstance(data,bytes):
+            return cast(data,c_void_p).value
+        if isinstance(data,c_void_p):
+            return data.value
+        return data
+
     def __bytes__(self):
         string = self.string
         if isinstance(string,c_void_p) or isinstance(string,int):
             string = string_at(string,self.size)
+        elif self.buffer is not None:
+            string = string_at(self.data,self.size)
         return string
 
     def __str__(self):
         return bytes(self).decode()
 
+    def __reduce__(self):
+        return (reliq_str,(bytes(self),))
+
     def __del__(self):
         if isinstance(self.string,c_void_p):
             libreliq.reliq_std_free(self.string,0)
+        if self.buffer is not None:
+            pythonapi.PyBuffer_Release(byref(self.buffer))
+            self.buffer = None
 
 class _reliq_cstr_struct(Structure):
     _fields_ = [('b',c_void_p),('s',c_size_t)]
@@ -122,10 +230,11 @@ class _reliq_scheme_struct(Structure):
 
 
 class reliq_compressed_list():
-    def __init__(self, nodes: c_void_p, compressed: POINTER(_reliq_compressed_struct), size: c_size_t):
+    def __init__(self, nodes: c_void_p, compressed: POINTER(_reliq_compressed_struct), size: c_size_t, owned: bool=True):
         self.compressed = cast(compressed,POINTER(_reliq_compressed_struct))
         self.size = size
         self.nodes = nodes
+        self.owned = owned
 
     def iter(self):
         i = 0
@@ -144,8 +253,18 @@ class reliq_compressed_list():
             i += 1
             yield hnode, parent
 
+    @classmethod
+    def from_nodes(cls, nodes: c_void_p, entries: list[Tuple[c_void_p,Optional[c_void_p]]]) -> 'reliq_compressed_list':
+        size = len(entries)
+        compressed = (_reliq_compressed_struct*size)()
+        for i, (hnode, parent) in enumerate(entries):
+            compressed[i].hnode = (hnode-nodes)//chnode_sz
+            # nodes of lists without parent are their own parents
+            compressed[i].parent = UINT32_MAX if parent is None or parent == hnode else (parent-nodes)//chnode_sz
+        return cls(nodes,compressed,c_size_t(size),owned=False)
+
     def __del__(self):
-        if self.compressed is not None:
+        if self.owned and self.compressed is not None:
             libreliq.reliq_std_free(self.compressed,0)
 
 class reliq_single:
@@ -155,6 +274,7 @@ class reliq_single:
         self.cparent = parent
         self._parent_d = None
         self.rq = rq.struct
+        self._attrib_d = {}
 
     @property
     def position(self):
@@ -171,7 +291,7 @@ class reliq_single:
     def hnode(self):
         if self._hnode_d is not None:
             return self._hnode_d
-        self._hnode_d = chnode_conv(self.rq.struct,self.chnode)
+        self._hnode_d = self.rq.hnode(self.chnode)
         return self._hnode_d
 
     @property
@@ -180,9 +300,130 @@ class reliq_single:
             return None
         if self._parent_d is not None:
             return self._parent_d
-        self._parent_d = chnode_conv(self.rq.struct,self.cparent)
+        self._parent_d = self.rq.hnode(self.cparent)
         return self._parent_d
 
+    def attrib(self, rq: "reliq", raw: bool) -> 'reliq_attrib':
+        views = raw and rq.views
+        ret = self._attrib_d.get((raw,views))
+        if ret is None:
+            ret = reliq_attrib(rq.data,self.rq,self.hnode,raw,views)
+            self._attrib_d[(raw,views)] = ret
+        return ret
+
+class reliq_attrib(dict):
+    # read-only dict of attributes with lowercase keys, lookups ignore case,
+    # values are decoded when first requested
+    __slots__ = ('raw','_spans','_data','_struct','_views')
+
+    def __init__(self, data: reliq_str, struct: 'reliq_struct', hnode: '_reliq_hnode_struct', raw: bool, views: bool):
+        spans = {}
+        for key, ptr, size in cattribs_conv(struct.struct,hnode.attribs,hnode.attribsl):
+            spans.setdefault(strconv(key,raw).lower(),[]).append((ptr,size))
+
+        # values are None until decoded, keys are set so that code reading dict directly gets its size right
+        super().__init__(dict.fromkeys(spans))
+        self.raw = raw
+        self._spans = spans
+        # values point to data, which has to be kept alive until they're decoded
+        self._data = data
+        self._struct = struct
+        self._views = views
+
+    def _key(self, key: str|bytes) -> str|bytes:
+        if isinstance(key,str):
+            if self.raw:
+                key = key.encode('utf-8')
+        elif isinstance(key,bytes):
+            if not self.raw:
+                key = key.decode()
+        else:
+            raise KeyError(key)
+        return key.lower()
+
+    def _value(self, key: str|bytes) -> str|bytes|memoryview:
+        value = dict.__getitem__(self,key)
+        if value is not None:
+            return value
+
+        raw = self.raw
+        value_separator = strconv(" ",raw)
+        for ptr, size in self._spans[key]:
+            if self._views:
+                v = self._data.slice(ptr,size,self._struct) if ptr else memoryview(b'')
+            else:
+                v = strconv(string_at(ptr,size),raw)
+            if value is not None and len(value) > 0:
+                v = value_separator.join((value,v))
+            value = v
+        dict.__setitem__(self,key,value)
+        return value
+
+    def _load(self):
+        for key in dict.__iter__(self):
+            self._value(key)
+
+    def __getitem__(self, key: str|bytes) -> str|bytes|memoryview:
+        try:
+            return self._value(self._key(key))
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key: str|bytes, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        try:
+            return dict.__contains__(self,self._key(key))
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        # makes dict(), update() and ** go through __getitem__ instead of copying values
+        return dict.__iter__(self)
+
+    def values(self):
+        self._load()
+        return dict.values(self)
+
+    def items(self):
+        self._load()
+        return dict.items(self)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __eq__(self, other) -> bool:
+        self._load()
+        if isinstance(other,reliq_attrib):
+            other._load()
+        return dict.__eq__(self,other)
+
+    def __ne__(self, other) -> bool:
+        r = self.__eq__(other)
+        return r if r is NotImplemented else not r
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self._load()
+        return dict.__repr__(self)
+
+    def __or__(self, other) -> dict:
+        return dict(self)|other
+
+    def __reduce__(self):
+        return (dict,(dict(self),))
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("attributes are read-only, dict(attrib) returns a copy")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    pop = popitem = setdefault = update = clear = _readonly
+
 class reliqType(Flag):
     empty = auto()
 
@@ -266,119 +507,458 @@ class _reliq_struct(Structure):
                 ('nodesl',c_size_t),
                 ('attribsl',c_size_t)]
 
-libreliq_functions = [
+def libreliq_functions(libreliq: CDLL) -> list:
+    return [
+        (
+            libreliq.reliq_init,
+            POINTER(_reliq_error_struct),
+            [c_void_p,c_size_t,POINTER(_reliq_struct)]
+        ),(
+            libreliq.reliq_free,
+            c_int,
+            [POINTER(_reliq_struct)]
+        ),(
+            libreliq.reliq_ecomp,
+            POINTER(_reliq_error_struct),
+            [c_void_p,c_size_t,POINTER(c_void_p)]
+        ),(
+            libreliq.reliq_efree,
+            None,
+            [c_void_p]
+        ),(
+            libreliq.reliq_exec,
+            POINTER(_reliq_error_struct),
+            [POINTER(_reliq_struct),POINTER(_reliq_compressed_struct),c_size_t,c_void_p,POINTER(c_void_p),POINTER(c_size_t)]
+        ),(
+            libreliq.reliq_exec_str,
+            POINTER(_reliq_error_struct),
+            [POINTER(_reliq_struct),POINTER(_reliq_compressed_struct),c_size_t,c_void_p,POINTER(c_void_p),POINTER(c_size_t)]
+        ),(
+            libreliq.reliq_from_compressed,
+            _reliq_struct,
+            [c_void_p,c_size_t,POINTER(_reliq_struct)]
+        ),(
+            libreliq.reliq_from_compressed_independent,
+            _reliq_struct,
+            [c_void_p,c_size_t,POINTER(_reliq_struct)]
+        ),(
+            libreliq.reliq_chnode_conv,
+            None,
+            [POINTER(_reliq_struct),c_void_p,POINTER(_reliq_hnode_struct)]
+        ),(
+            libreliq.reliq_cattrib_conv,
+            None,
+            [POINTER(_reliq_struct),c_void_p,POINTER(_reliq_attrib_struct)]
+        ),(
+            libreliq.reliq_hnode_starttag,
+            c_void_p,
+            [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
+        ),(
+            libreliq.reliq_hnode_endtag,
+            c_void_p,
+            [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
+        ),(
+            libreliq.reliq_hnode_endtag_strip,
+            c_void_p,
+            [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
+        ),(
+            libreliq.reliq_std_free,
+            c_int,
+            [c_void_p,c_size_t]
+        ),(
+            libreliq.reliq_decode_entities_str,
+            None,
+            [c_void_p,c_size_t,POINTER(c_void_p),POINTER(c_size_t),c_bool]
+        ),(
+            libreliq.reliq_encode_entities_str,
+            None,
+            [c_void_p,c_size_t,POINTER(c_void_p),POINTER(c_size_t),c_bool]
+        ),(
+            libreliq.reliq_scheme,
+            _reliq_scheme_struct,
+            [c_void_p]
+        ),(
+            libreliq.reliq_scheme_free,
+            None,
+            [POINTER(_reliq_scheme_struct)]
+        ),(
+            libreliq.reliq_set_url,
+            None,
+            [POINTER(_reliq_struct),c_char_p,c_size_t]
+        ),(
+            libreliq.reliq_url_parse,
+            None,
+            [c_char_p,c_size_t,c_char_p,c_size_t,c_bool,POINTER(_reliq_url_struct)]
+        ),(
+            libreliq.reliq_url_join,
+            None,
+            [POINTER(_reliq_url_struct),POINTER(_reliq_url_struct),POINTER(_reliq_url_struct)]
+        ),(
+            libreliq.reliq_url_free,
+            None,
+            [POINTER(_reliq_url_struct)]
+        )
+    ]
+
+def def_functions(functions):
+    for i in functions:
+        i[0].restype = i[1]
+        i[0].argtypes = i[2]
+
+def_functions([
     (
-		libreliq.reliq_init,
-		POINTER(_reliq_error_struct),
-		[c_void_p,c_size_t,POINTER(_reliq_struct)]
-    ),(
-		libreliq.reliq_free,
-		c_int,
-		[POINTER(_reliq_struct)]
-    ),(
-        libreliq.reliq_ecomp,
-        POINTER(_reliq_error_struct),
-        [c_void_p,c_size_t,POINTER(c_void_p)]
-    ),(
-        libreliq.reliq_efree,
-        None,
-        [c_void_p]
-    ),(
-		libreliq.reliq_exec,
-		POINTER(_reliq_error_struct),
-		[POINTER(_reliq_struct),POINTER(_reliq_compressed_struct),c_size_t,c_void_p,POINTER(c_void_p),POINTER(c_size_t)]
-    ),(
-		libreliq.reliq_exec_str,
-		POINTER(_reliq_error_struct),
-		[POINTER(_reliq_struct),POINTER(_reliq_compressed_struct),c_size_t,c_void_p,POINTER(c_void_p),POINTER(c_size_t)]
-    ),(
-        libreliq.reliq_from_compressed,
-        _reliq_struct,
-        [c_void_p,c_size_t,POINTER(_reliq_struct)]
-    ),(
-        libreliq.reliq_from_compressed_independent,
-        _reliq_struct,
-        [c_void_p,c_size_t,POINTER(_reliq_struct)]
-    ),(
-        libreliq.reliq_chnode_conv,
-        None,
-        [POINTER(_reliq_struct),c_void_p,POINTER(_reliq_hnode_struct)]
-    ),(
-        libreliq.reliq_cattrib_conv,
-        None,
-        [POINTER(_reliq_struct),c_void_p,POINTER(_reliq_attrib_struct)]
-    ),(
-        libreliq.reliq_hnode_starttag,
-        c_void_p,
-        [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
-    ),(
-        libreliq.reliq_hnode_endtag,
-        c_void_p,
-        [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
-    ),(
-        libreliq.reliq_hnode_endtag_strip,
-        c_void_p,
-        [POINTER(_reliq_hnode_struct),POINTER(c_size_t)]
-    ),(
-        libreliq.reliq_std_free,
+        pythonapi.PyObject_GetBuffer,
         c_int,
-        [c_void_p,c_size_t]
+        [py_object,POINTER(_py_buffer_struct),c_int]
     ),(
-        libreliq.reliq_decode_entities_str,
+        pythonapi.PyBuffer_Release,
         None,
-        [c_void_p,c_size_t,POINTER(c_void_p),POINTER(c_size_t),c_bool]
-    ),(
-        libreliq.reliq_encode_entities_str,
-        None,
-        [c_void_p,c_size_t,POINTER(c_void_p),POINTER(c_size_t),c_bool]
-    ),(
-        libreliq.reliq_scheme,
-        _reliq_scheme_struct,
-        [c_void_p]
-    ),(
-        libreliq.reliq_scheme_free,
-        None,
-        [POINTER(_reliq_scheme_struct)]
-    ),(
-        libreliq.reliq_set_url,
-        None,
-        [POINTER(_reliq_struct),c_char_p,c_size_t]
-    ),(
-        libreliq.reliq_url_parse,
-        None,
-        [c_char_p,c_size_t,c_char_p,c_size_t,c_bool,POINTER(_reliq_url_struct)]
-    ),(
-        libreliq.reliq_url_join,
-        None,
-        [POINTER(_reliq_url_struct),POINTER(_reliq_url_struct),POINTER(_reliq_url_struct)]
-    ),(
-        libreliq.reliq_url_free,
-        None,
-        [POINTER(_reliq_url_struct)]
+        [POINTER(_py_buffer_struct)]
     )
-]
+])
 
-chnode_sz = c_uint8.in_dll(libreliq,"reliq_chnode_sz").value
-cattrib_sz = c_uint8.in_dll(libreliq,"reliq_cattrib_sz").value
+def load_libreliq() -> CDLL:
+    global libreliq, chnode_sz, cattrib_sz, _native
 
-def def_functions(functions):
-    for i in functions:
-        i[0].restype = i[1]
-        i[0].argtypes = i[2]
+    lib = libreliq
+    if not isinstance(lib,reliq_lib):
+        return lib
+
+    with lib.lock:
+        if not isinstance(libreliq,reliq_lib):
+            return libreliq
 
-def_functions(libreliq_functions)
+        lib = CDLL(libreliq_path)
+        def_functions(libreliq_functions(lib))
+
+        chnode_sz = c_uint8.in_dll(lib,"reliq_chnode_sz").value
+        cattrib_sz = c_uint8.in_dll(lib,"reliq_cattrib_sz").value
+
+        # optional extension replacing loops over nodes, used only if its structures match
+        if _native is not None:
+            if (_native.hnode_size != sizeof(_reliq_hnode_struct)
+                or _native.attrib_size != sizeof(_reliq_attrib_struct)
+                or _native.url_size != sizeof(_reliq_url_struct)):
+                _native = None
+            else:
+                _native.init(
+                    cast(lib.reliq_chnode_conv,c_void_p).value,
+                    cast(lib.reliq_cattrib_conv,c_void_p).value,
+                    cast(lib.reliq_url_parse,c_void_p).value,
+                    cast(lib.reliq_url_join,c_void_p).value,
+                    cast(lib.reliq_url_free,c_void_p).value,
+                    chnode_sz,
+                    cattrib_sz
+                )
+
+        libreliq = lib
+    return lib
+
+def __getattr__(name):
+    if name in ('chnode_sz','cattrib_sz'):
+        load_libreliq()
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__,name))
 
 def chnode_conv(rq: _reliq_struct, s: c_void_p) -> _reliq_hnode_struct:
     ret = _reliq_hnode_struct()
-    libreliq.reliq_chnode_conv(byref(rq),s,byref(ret))
+    if _native is not None:
+        _native.chnode_conv(addressof(rq),s,ret)
+    else:
+        libreliq.reliq_chnode_conv(byref(rq),s,byref(ret))
+    return ret
+
+def cattribs_conv(rq: _reliq_struct, attribs: int, attribsl: int) -> list[Tuple[bytes,int,int]]:
+    # (key, value pointer, value length) of every attribute
+    if _native is not None:
+        return _native.attribs(addressof(rq),attribs or 0,attribsl)
+
+    ret = []
+    a = _reliq_attrib_struct()
+    conv = libreliq.reliq_cattrib_conv
+    rq = byref(rq)
+    aref = byref(a)
+    for i in range(attribsl):
+        conv(rq,attribs+i*cattrib_sz,aref)
+        ret.append((string_at(a.key.b,a.key.s),a.value.b,a.value.s))
     return ret
 
+class reliqNodesTable():
+    columns = {
+        'lvl': 'H',
+        'type': 'B',
+        'tag_count': 'I',
+        'text_count': 'I',
+        'comment_count': 'I',
+        'attribsl': 'I',
+        'all_off': 'Q',
+        'all_len': 'Q',
+        'tag_off': 'Q',
+        'tag_len': 'Q',
+        'insides_off': 'Q',
+        'insides_len': 'Q',
+    }
+
+    def __init__(self, struct: _reliq_struct):
+        nodes = struct.nodes
+        nodesl = struct.nodesl
+        data = struct.data
+
+        for name, typecode in self.columns.items():
+            setattr(self,name,array(typecode,bytes(array(typecode).itemsize*nodesl)))
+
+        if _native is not None:
+            _native.table(addressof(struct),nodes or 0,nodesl,data or 0,[getattr(self,i) for i in self.columns])
+            return
+
+        lvl = self.lvl
+        ntype = self.type
+        tag_count = self.tag_count
+        text_count = self.text_count
+        comment_count = self.comment_count
+        attribsl = self.attribsl
+        all_off = self.all_off
+        all_len = self.all_len
+        tag_off = self.tag_off
+        tag_len = self.tag_len
+        insides_off = self.insides_off
+        insides_len = self.insides_len
+
+        conv = libreliq.reliq_chnode_conv
+        rq = byref(struct)
+        hn = _reliq_hnode_struct()
+        hnref = byref(hn)
+
+        i = 0
+        while i < nodesl:
+            conv(rq,nodes+i*chnode_sz,hnref)
+
+            lvl[i] = hn.lvl
+            ntype[i] = hn.type
+            tag_count[i] = hn.tag_count
+            text_count[i] = hn.text_count
+            comment_count[i] = hn.comment_count
+            attribsl[i] = hn.attribsl
+
+            all_off[i] = hn.all.b-data
+            all_len[i] = hn.all.s
+            if hn.tag.b:
+                tag_off[i] = hn.tag.b-data
+                tag_len[i] = hn.tag.s
+            if hn.insides.b:
+                insides_off[i] = hn.insides.b-data
+                insides_len[i] = hn.insides.s
+            i += 1
+
+    def __len__(self):
+        return len(self.lvl)
+
+    def desc(self, i: int) -> int:
+        return self.tag_count[i]+self.text_count[i]+self.comment_count[i]
+
+    def numpy(self) -> dict:
+        import numpy
+
+        return {i: numpy.frombuffer(getattr(self,i),dtype=t) for i, t in self.columns.items()}
+
+reliq_cache_info = namedtuple('reliq_cache_info',['hits','misses','maxsize','currsize'])
+
 class reliq_struct():
-    def __init__(self,struct: _reliq_struct):
+    cache_size = 16384
+
+    def __init__(self,struct: _reliq_struct,buffers: Optional[tuple]=None):
         self.struct = struct
+        # if set, arrays of structure are owned by these objects and not by libreliq
+        self.buffers = buffers
+        self._table = None
+
+        self._parents = None
+
+        self._hnodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def parents(self) -> array:
+        if self._parents is None:
+            # position of parent for every node, UINT32_MAX for nodes at level 0
+            struct = self.struct
+            nodesl = struct.nodesl
+            parents = array('I',bytes(array('I').itemsize*nodesl))
+            if _native is not None:
+                _native.parents(addressof(struct),struct.nodes or 0,nodesl,parents)
+                self._parents = parents
+                return parents
+
+            if self._table is not None:
+                levels = self._table.lvl
+            else:
+                conv = libreliq.reliq_chnode_conv
+                rq = byref(struct)
+                hn = _reliq_hnode_struct()
+                hnref = byref(hn)
+                nodes = struct.nodes
+
+                def levels_conv():
+                    for i in range(nodesl):
+                        conv(rq,nodes+i*chnode_sz,hnref)
+                        yield hn.lvl
+                levels = levels_conv()
+
+            stack = []
+            for i, l in enumerate(levels):
+                del stack[l:]
+                parents[i] = stack[-1] if l > 0 and len(stack) == l else UINT32_MAX
+                stack.append(i)
+            self._parents = parents
+        return self._parents
+
+    def siblings(self, node: int, end: int, lvl: int) -> Generator[Tuple[int,_reliq_hnode_struct],None,None]:
+        # consecutive nodes at lvl starting from node, descendants are jumped over,
+        # nodes are visited once so node cache is bypassed
+        struct = self.struct
+        while node < end:
+            hn = chnode_conv(struct,node)
+            if hn.lvl != lvl:
+                break
+            yield node, hn
+            node += (hn.desc+1)*chnode_sz
+
+    def siblings_many(self, node: int, end: int, lvl: int, children: bool=False) -> list[int]:
+        # like siblings() but only nodes, if children is set nodes at lvl+1 in every sibling are returned
+        if _native is not None:
+            return _native.siblings(addressof(self.struct),node,end,lvl,children)
+
+        siblings = self.siblings
+        if not children:
+            return [i for i, _ in siblings(node,end,lvl)]
+
+        ret = []
+        for i, hn in siblings(node,end,lvl):
+            i += chnode_sz
+            ret += [j for j, _ in siblings(i,i+hn.desc*chnode_sz,lvl+1)]
+        return ret
+
+    def hnode(self, node: int) -> _reliq_hnode_struct:
+        hnodes = self._hnodes
+        hn = hnodes.get(node)
+        if hn is not None:
+            hnodes.move_to_end(node)
+            self.hits += 1
+            return hn
+
+        self.misses += 1
+        hn = chnode_conv(self.struct,node)
+        if len(hnodes) >= self.cache_size:
+            hnodes.popitem(last=False)
+        hnodes[node] = hn
+        return hn
+
+    def cache_info(self) -> reliq_cache_info:
+        return reliq_cache_info(self.hits,self.misses,self.cache_size,len(self._hnodes))
+
+    @property
+    def table(self) -> reliqNodesTable:
+        if self._table is None:
+            self._table = reliqNodesTable(self.struct)
+        return self._table
+
+    @classmethod
+    def from_buffers(cls, nodes, attribs, nodesl: int, attribsl: int, url: bytes=b"", data: Optional[reliq_str]=None) -> 'reliq_struct':
+        load_libreliq() # sizes of nodes are needed before any call
+        nodes = reliq_str(nodes)
+        attribs = reliq_str(attribs)
+
+        struct = _reliq_struct()
+        struct.nodes = nodes.address
+        struct.nodesl = nodesl
+        struct.attribs = attribs.address
+        struct.attribsl = attribsl
+        if len(url) > 0:
+            libreliq.reliq_url_parse(url,len(url),None,0,True,byref(struct.url))
+
+        ret = cls(struct,(nodes,attribs))
+        if data is not None:
+            ret.set_data(data)
+        return ret
+
+    def set_data(self, data: reliq_str):
+        self.struct.data = data.address
+        self.struct.datal = data.size
+        self.buffers = (*self.buffers[:2],data)
+
+    def __reduce__(self):
+        struct = self.struct
+        url = bytes(struct.url.url) if struct.url.allocated else b""
+        return (reliq_struct.from_buffers,(
+            string_at(struct.nodes,struct.nodesl*chnode_sz),
+            string_at(struct.attribs,struct.attribsl*cattrib_sz),
+            struct.nodesl,
+            struct.attribsl,
+            url
+        ))
 
     def __del__(self):
-        libreliq.reliq_free(byref(self.struct))
+        if self.buffers is None:
+            libreliq.reliq_free(byref(self.struct))
+        elif self.struct.url.allocated:
+            libreliq.reliq_url_free(byref(self.struct.url))
+
+def json_bytes(obj):
+    if isinstance(obj,str):
+        return obj.encode('utf-8','surrogatepass')
+    if isinstance(obj,dict):
+        return {k: json_bytes(v) for k, v in obj.items()}
+    if isinstance(obj,list):
+        return [json_bytes(i) for i in obj]
+    return obj
+
+def json_loads(src: int, srcl: int, raw: bool=False):
+    import json
+    ret = json.loads(string_at(src,srcl))
+    if raw:
+        ret = json_bytes(ret)
+    return ret
+
+def urljoin_many(ref: _reliq_url_struct, urls: typing.Iterable[str|bytes], raw: bool) -> list[str|bytes]:
+    if _native is not None:
+        return _native.urljoin(addressof(ref),urls,raw)
+
+    ret = []
+    scheme = cast(ref.scheme.b,c_char_p)
+    for url in urls:
+        url = tobytes(url)
+        url_struct = _reliq_url_struct()
+        libreliq.reliq_url_parse(url,len(url),scheme,ref.scheme.s,False,byref(url_struct))
+        libreliq.reliq_url_join(byref(ref),byref(url_struct),byref(url_struct))
+        ret.append(strconv(bytes(url_struct.url),raw))
+        libreliq.reliq_url_free(byref(url_struct))
+    return ret
+
+def shared_attach(name: str) -> shared_memory.SharedMemory:
+    # segment belongs to its creator, on python < 3.13 SharedMemory() registers it in
+    # resource tracker of this process which unlinks it when the process exits
+    from multiprocessing import shared_memory
+
+    if sys.version_info >= (3,13):
+        return shared_memory.SharedMemory(name=name,track=False)
+    if os.name != 'posix':
+        return shared_memory.SharedMemory(name=name)
+
+    import _posixshmem
+
+    shm = object.__new__(shared_memory.SharedMemory)
+    shm._name = name if name.startswith('/') else '/'+name
+    shm._fd = _posixshmem.shm_open(shm._name,os.O_RDWR,mode=0o600)
+    try:
+        shm._size = os.fstat(shm._fd).st_size
+        shm._mmap = mmaplib.mmap(shm._fd,shm._size)
+    except:
+        os.close(shm._fd)
+        shm._fd = -1
+        raise
+    shm._buf = memoryview(shm._mmap)
+    return shm
 
 def tobytes(text: bytes|str, encoding="utf-8") -> bytes:
     if isinstance(text,bytes):
@@ -388,7 +968,7 @@ def tobytes(text: bytes|str, encoding="utf-8") -> bytes:
 class reliqExpr():
     @staticmethod
     def scriptbytes(x):
-        if isinstance(x,Path):
+        if ispath(x):
             return x.read_bytes()
         return tobytes(x)
 
@@ -397,6 +977,7 @@ class reliqExpr():
 
         self.scheme = None
         self.expr = None
+        self.size = len(s)
 
         expr = c_void_p()
         err = libreliq.reliq_ecomp(cast(s,c_void_p),len(s),byref(expr))
@@ -428,6 +1009,227 @@ class reliqExpr():
         if self.expr is not None:
             libreliq.reliq_efree(self.expr)
 
+reliq_extract_stats = namedtuple('reliq_extract_stats',['files','errors','input','output','time'])
+
+reliq_expr_cache_info = namedtuple('reliq_expr_cache_info',['hits','misses','evictions','maxsize','maxbytes','currsize','currbytes'])
+
+expr_caches = weakref.WeakSet()
+
+def _expr_caches_reset():
+    # compiled expressions are inherited by forked children, but lock
+    # might be held by other thread at the time of fork
+    for cache in expr_caches:
+        cache.lock = Lock()
+
+if hasattr(os,'register_at_fork'):
+    os.register_at_fork(after_in_child=_expr_caches_reset)
+
+class reliqExprCache():
+    def __init__(self, maxsize: Optional[int]=None, maxbytes: Optional[int]=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        expr_caches.add(self)
+
+    def _remove(self, key):
+        expr, stamp = self.entries.pop(key)
+        self.bytes -= expr.size
+
+    def get(self, key, create: Callable[[],reliqExpr], stamp=None) -> reliqExpr:
+        with self.lock:
+            r = self.entries.get(key)
+            if r is not None:
+                if r[1] == stamp:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return r[0]
+                self._remove(key)
+            self.misses += 1
+
+        # compiling doesn't block other threads, the same expression might be
+        # compiled concurrently in which case the first one inserted is kept
+        expr = create()
+
+        with self.lock:
+            r = self.entries.get(key)
+            if r is not None:
+                if r[1] == stamp:
+                    self.entries.move_to_end(key)
+                    return r[0]
+                self._remove(key)
+
+            self.entries[key] = (expr,stamp)
+            self.bytes += expr.size
+
+            while len(self.entries) > 1 and (
+                (self.maxsize is not None and len(self.entries) > self.maxsize)
+                or (self.maxbytes is not None and self.bytes > self.maxbytes)):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+            return expr
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def info(self) -> reliq_expr_cache_info:
+        with self.lock:
+            return reliq_expr_cache_info(self.hits,self.misses,self.evictions,self.maxsize,self.maxbytes,len(self.entries),self.bytes)
+
+expr_cache = reliqExprCache(maxsize=256)
+
+class reliqParser():
+    def __init__(self, ref: Optional[str|bytes]=None, size_hint: int=0, cls: Optional[type]=None):
+        self.ref = ref
+        self.cls = reliq if cls is None else cls
+        self.buffer = bytearray(size_hint)
+        self.size = 0
+        self.closed = False
+
+    def feed(self, chunk: str|bytes|bytearray|memoryview):
+        if self.closed:
+            raise ValueError("feed() called on closed parser")
+        if isinstance(chunk,str):
+            chunk = chunk.encode("utf-8")
+
+        buffer = self.buffer
+        size = self.size
+        end = size+memoryview(chunk).nbytes
+        if end <= len(buffer):
+            buffer[size:end] = chunk
+        else:
+            del buffer[size:]
+            buffer += chunk
+        self.size = end
+
+    def close(self) -> 'reliq':
+        if self.closed:
+            raise ValueError("close() called on closed parser")
+        self.closed = True
+
+        data = self.buffer
+        if self.size != len(data):
+            data = memoryview(data)[:self.size]
+        self.buffer = None
+        return self.cls(data,ref=self.ref)
+
+class reliqNode:
+    # handle of a single node, anything not defined here is taken from reliq object created on first use
+    __slots__ = ('rq','node','_parent','_full')
+
+    def __init__(self, rq: 'reliq', node: int, parent: Optional[int]):
+        self.rq = rq
+        self.node = node
+        self._parent = parent
+        self._full = None
+
+    def expand(self) -> 'reliq':
+        if self._full is None:
+            self._full = self.rq._init_single(self.rq,self.node,self._parent)
+        return self._full
+
+    def __getattr__(self, name):
+        return getattr(self.expand(),name)
+
+    @property
+    def hnode(self) -> _reliq_hnode_struct:
+        return self.rq.struct.hnode(self.node)
+
+    @property
+    def type(self) -> reliqType:
+        return self.hnode.ntype
+
+    @property
+    def position(self) -> int:
+        return (self.node-self.rq.struct.struct.nodes)//chnode_sz
+
+    @property
+    def rposition(self) -> int:
+        if self._parent is None:
+            return self.position
+        return (self.node-self._parent)//chnode_sz
+
+    @property
+    def lvl(self) -> int:
+        return self.hnode.lvl
+
+    @property
+    def rlvl(self) -> int:
+        lvl = self.hnode.lvl
+        if self._parent is None:
+            return lvl
+        return lvl-self.rq.struct.hnode(self._parent).lvl
+
+    def _name(self, raw: bool=False) -> Optional[str|bytes|memoryview]:
+        hn = self.hnode
+        if hn.ntype is not reliqType.tag:
+            return None
+        return self.rq._strconv(hn.tag,raw)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._name()
+
+    @property
+    def name_raw(self) -> Optional[bytes|memoryview]:
+        return self._name(True)
+
+    def _attrib(self, raw: bool=False) -> dict|reliq_attrib:
+        hn = self.hnode
+        if hn.ntype is not reliqType.tag:
+            return {}
+        rq = self.rq
+        return reliq_attrib(rq.data,rq.struct,hn,raw,raw and rq.views)
+
+    @property
+    def attrib(self) -> dict|reliq_attrib:
+        return self._attrib()
+
+    @property
+    def attrib_raw(self) -> dict|reliq_attrib:
+        return self._attrib(True)
+
+    @property
+    def attribl(self) -> int:
+        hn = self.hnode
+        if hn.ntype is not reliqType.tag:
+            return 0
+        return hn.attribsl
+
+    @property
+    def desc_count(self) -> int:
+        hn = self.hnode
+        if hn.ntype is not reliqType.tag:
+            return 0
+        return hn.desc
+
+    def __bytes__(self):
+        return bytes(self.expand())
+
+    def __str__(self):
+        return str(self.expand())
+
+    def __repr__(self):
+        return repr(self.expand())
+
+    def __getitem__(self, item):
+        return self.expand()[item]
+
+    def __len__(self):
+        return len(self.expand())
+
+    def __reduce__(self):
+        return self.expand().__reduce__()
 
 class reliq():
     @classmethod
@@ -448,12 +1250,19 @@ class reliq():
         ret.single = reliq_single(ret,hnode,parent)
         return ret
 
-    def __init__(self,html: Optional[typing.Union[str,bytes,Path,'reliq']]=None,ref: Optional[str|bytes]=None):
+    def __init__(self,html: Optional[typing.Union[str,bytes,bytearray,memoryview,mmaplib.mmap,Path,'reliq']]=None,ref: Optional[str|bytes]=None,views: Optional[bool]=None):
+        self._index: Optional[list[Tuple[c_void_p,Optional[c_void_p]]]] = None
+
+        if views is not None:
+            self.views = views
+
         if isinstance(html,reliq):
             self.data = html.data
             self.struct = html.struct
             self.single = html.single
             self.compressed = html.compressed
+            if views is None:
+                self.views = html.views
             return
 
         self.data: Optional[reliq_str] = None
@@ -477,6 +1286,15 @@ class reliq():
 
     expr = reliqExpr
     Type = reliqType
+    Node = reliqNode
+    NodesTable = reliqNodesTable
+    ExprCache = reliqExprCache
+
+    @classmethod
+    def Parser(cls, ref: Optional[str|bytes]=None, size_hint: int=0) -> reliqParser:
+        return reliqParser(ref,size_hint,cls)
+
+    views = False
 
     class Error(Exception):
         pass
@@ -498,7 +1316,7 @@ class reliq():
         if rtype in self.Type.list:
             ret = []
             for hnode, parent in self.compressed.iter():
-                hn = chnode_conv(self.struct.struct,hnode)
+                hn = self.struct.hnode(hnode)
                 nodesl = hn.desc+1
                 if parent is None:
                     parent = hnode
@@ -524,11 +1342,6 @@ class reliq():
             return True
         return False
 
-    def _getitem_r(self, type: reliqType) -> Generator['reliq',None,None]:
-        if type in self.Type.single:
-            return self.children(gen=True)
-        return self.self(gen=True)
-
     def _noaxis(self) -> Optional[reliqType]:
         rtype = self.type
 
@@ -537,173 +1350,187 @@ class reliq():
 
         return rtype
 
-    def __getitem__(self,item) -> 'reliq':
+    def _getindex(self) -> list[Tuple[c_void_p,Optional[c_void_p]]]:
+        if self._index is not None:
+            return self._index
+
+        index = []
         rtype = self._noaxis()
 
-        if rtype is not None:
-            if rtype in self.Type.struct:
-                nodes, nodesl, lvl, parent = self._elnodes()[0]
-                if item >= nodesl:
-                    raise IndexError("list index out of range")
-            elif rtype in self.Type.list:
-                if item >= self.compressed.size.value:
-                    raise IndexError("list index out of range")
+        if rtype is None:
+            pass
+        elif rtype is self.Type.list:
+            index = [(hnode,hnode if parent is None else parent) for hnode, parent in self.compressed.iter()]
+        else:
+            struct = self.struct.struct
+            if rtype in self.Type.single:
+                node = self.single.chnode
+                hn = self.single.hnode
+                end = node+(hn.desc+1)*chnode_sz
+                node += chnode_sz
+                parent = self.single.cparent
+            else:
+                # nodes is None for empty document
+                node = struct.nodes or 0
+                end = node+struct.nodesl*chnode_sz
+                parent = None
+
+            while node < end:
+                hn = chnode_conv(struct,node)
+                if hn.ntype is self.Type.tag:
+                    index.append((node,parent))
+                node += (hn.desc+1)*chnode_sz
+
+        self._index = index
+        return index
 
-            index = 0
-            for i in self._getitem_r(rtype):
-                if index == item:
-                    return i
-                index += 1
+    def __getitem__(self,item) -> 'reliq':
+        index = self._getindex()
+
+        if isinstance(item,slice):
+            entries = index[item]
+            if len(entries) == 0:
+                return self._new(None)
+            ret = self._new(self)
+            ret.single = None
+            ret.compressed = reliq_compressed_list.from_nodes(self.struct.struct.nodes,entries)
+            # keeps parents of entries that can't be expressed in compressed list
+            ret._index = entries
+            return ret
 
-        raise IndexError("list index out of range")
+        hnode, parent = index[item]
+        return self._init_single(self,hnode,parent)
 
     def __len__(self):
-        if self._noaxis() is None:
-            return 0
-
-        count = 0
-        for i in self._getitem_r(self.type):
-            count += 1
-        return count
+        return len(self._getindex())
 
-    def _axis(self, gen: bool, func: Callable, type: Optional[reliqType], rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def _axis(self, gen: bool, func: Callable, type: Optional[reliqType], rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def y():
             if self._noaxis() is None:
                 return
 
+            struct = self.struct.struct
+            init = reliqNode if light else self._init_single
             for nodes, nodesl, lvl, parent in self._elnodes():
                 if rel:
                     parent = nodes
 
-                for i in func(self,nodes,nodesl,lvl,parent):
-                    if type is not None and not (i.type&type):
-                        continue
-                    yield i
+                # func yields node, parent and converted node if it has it, walks over
+                # many nodes convert them without node cache
+                for node, p, hn in func(self,nodes,nodesl,lvl,parent):
+                    if type is not None:
+                        if hn is None:
+                            hn = chnode_conv(struct,node)
+                        if not (hn.ntype&type):
+                            continue
+                    r = init(self,node,p)
+                    if hn is not None and not light:
+                        r.single._hnode_d = hn
+                    yield r
 
         r = y()
         if not gen:
             r = list(r)
         return r
 
-    def self(self, gen=False, type="", rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def self(self, gen=False, type="", rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
-            i = 0
-            while i < nodesl:
-                n = self._init_single(self,nodes+i*chnode_sz,parent)
-                i += n.single.hnode.desc+1
-                yield n
+            if nodesl == 0:
+                return
+            for node in self.struct.siblings_many(nodes,nodes+nodesl*chnode_sz,lvl):
+                yield node,parent,None
 
         if type == "":
             type = self.Type.tag if self.compressed is None else None
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def children(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def children(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
-            i = 1
-            lvl += 1
-            while i < nodesl:
-                node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
-
-                if hn.lvl == lvl:
-                    n = self._init_single(self,node,parent)
-                    i += hn.desc+1
-                    yield n
-                else:
-                    i += 1
+            if nodesl == 0:
+                return
+            for node in self.struct.siblings_many(nodes,nodes+nodesl*chnode_sz,lvl,True):
+                yield node,parent,None
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def descendants(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def descendants(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
-            ret = []
+            struct = self.struct.struct
             i = 1
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
+                hn = chnode_conv(struct,node)
 
                 if hn.lvl > lvl:
-                    yield self._init_single(self,node,parent)
+                    yield node,parent,hn
                 i += 1
-            return ret
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def full(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def full(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
+            struct = self.struct.struct
             i = 0
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
+                hn = chnode_conv(struct,node)
 
                 if hn.lvl >= lvl:
-                    yield self._init_single(self,node,parent)
+                    yield node,parent,hn
                 i += 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def everything(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def everything(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             i = 0
             nodes = self.struct.struct.nodes
             nodesl = self.struct.struct.nodesl
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
-                yield self._init_single(self,node,parent)
+                yield node,parent,None
                 i += 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def rparent(self, gen=False, type=reliqType.tag) -> list['reliq']|Generator['reliq',None,None]:
+    def rparent(self, gen=False, type=reliqType.tag, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if parent is not None:
-                yield self._init_single(self,parent,nodes)
-
-        return self._axis(gen,from_nodes,type=type)
+                yield parent,nodes,self.struct.hnode(parent)
 
-    def _find_parent(self, nodes, lvl):
-        lvl -= 1
-        j = (nodes-self.struct.struct.nodes)//chnode_sz-1
-        while True:
-            node = self.struct.struct.nodes+j*chnode_sz
-            hn = chnode_conv(self.struct.struct,node)
-            if hn.lvl == lvl:
-                return node, hn.lvl
+        return self._axis(gen,from_nodes,type=type,light=light)
 
-            if j == 0:
-                break
-            j -= 1
-        return None, 0
+    def _find_parent(self, node: int) -> Optional[int]:
+        nodes = self.struct.struct.nodes
+        p = self.struct.parents[(node-nodes)//chnode_sz]
+        if p == UINT32_MAX:
+            return None
+        return nodes+p*chnode_sz
 
-    def parent(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def parent(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
-            p, lvl = self._find_parent(nodes,lvl)
-            if p:
-                yield self._init_single(self,p,parent)
+            p = self._find_parent(nodes)
+            if p is not None:
+                yield p,parent,self.struct.hnode(p)
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def ancestors(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def ancestors(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
-            node = nodes
-            nodes = self.struct.struct.nodes
-
-            while node != nodes:
-                node, lvl = self._find_parent(node,lvl)
-                if node is None:
-                    break
 
-                yield self._init_single(self,node,parent)
+            node = self._find_parent(nodes)
+            while node is not None:
+                yield node,parent,self.struct.hnode(node)
+                node = self._find_parent(node)
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def before(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def before(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
@@ -711,46 +1538,33 @@ class reliq():
             nodes = self.struct.struct.nodes
 
             i = (node-nodes)//chnode_sz-1
-            while True:
-                node = nodes+i*chnode_sz
-                yield self._init_single(self,node,parent)
-                if i == 0:
-                    break
+            while i >= 0:
+                yield nodes+i*chnode_sz,parent,None
                 i -= 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def preceding(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def preceding(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
             node = nodes
             nodes = self.struct.struct.nodes
-            if node == nodes:
-                return
-            lvl = chnode_conv(self.struct.struct,node).lvl
-            lvl = -1 if lvl == 0 else lvl-1
-
-            i = (node-nodes)//chnode_sz-1
-            while True:
-                node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
-                if hn.lvl == lvl:
-                    if i == 0:
-                        break
-                    lvl -= 1
-                    i -= 1
-                    continue
-
-                yield self._init_single(self,node,parent)
-
-                if i == 0:
-                    break
+            parents = self.struct.parents
+
+            i = (node-nodes)//chnode_sz
+            ancestor = parents[i]
+            i -= 1
+            while i >= 0:
+                if i == ancestor:
+                    ancestor = parents[i]
+                else:
+                    yield nodes+i*chnode_sz,parent,None
                 i -= 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def after(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def after(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
@@ -761,29 +1575,29 @@ class reliq():
             i = (node-nodes)//chnode_sz+1
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                yield self._init_single(self,node,parent)
+                yield node,parent,None
                 i += 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def subsequent(self, gen=False, type=reliqType.tag, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def subsequent(self, gen=False, type=reliqType.tag, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
             node = nodes
-            hn = chnode_conv(self.struct.struct,node)
+            hn = self.struct.hnode(node)
             nodes = self.struct.struct.nodes
             nodesl = self.struct.struct.nodesl
 
             i = (node-nodes)//chnode_sz+hn.desc+1
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                yield self._init_single(self,node,parent)
+                yield node,parent,None
                 i += 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def siblings_preceding(self, gen=False, type=reliqType.tag, full=False, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def siblings_preceding(self, gen=False, type=reliqType.tag, full=False, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
@@ -792,91 +1606,162 @@ class reliq():
             if nodes == node:
               return
 
+            struct = self.struct.struct
             i = (node-nodes)//chnode_sz-1
             while True:
                 node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
+                hn = chnode_conv(struct,node)
 
                 if hn.lvl < lvl:
                     break
 
                 if full or hn.lvl == lvl:
-                    yield self._init_single(self,node,parent)
+                    yield node,parent,hn
 
                 if i == 0:
                     break
                 i -= 1
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def siblings_subsequent(self, gen=False, type=reliqType.tag, full=False, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def siblings_subsequent(self, gen=False, type=reliqType.tag, full=False, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         def from_nodes(self, nodes, nodesl, lvl, parent):
             if self.Type.struct in self.type:
                 return
             node = nodes
-            hn = chnode_conv(self.struct.struct,node)
+            hn = self.struct.hnode(node)
             nodes = self.struct.struct.nodes
             nodesl = self.struct.struct.nodesl
 
             i = (node-nodes)//chnode_sz+hn.desc+1
+            if not full:
+                if i >= nodesl:
+                    return
+                for node in self.struct.siblings_many(nodes+i*chnode_sz,nodes+nodesl*chnode_sz,lvl):
+                    yield node,parent,None
+                return
+
+            struct = self.struct.struct
             while i < nodesl:
                 node = nodes+i*chnode_sz
-                hn = chnode_conv(self.struct.struct,node)
-
-                if full:
-                    if hn.lvl < lvl:
-                        break
-                elif hn.lvl != lvl:
+                hn = chnode_conv(struct,node)
+                if hn.lvl < lvl:
                     break
 
-                node = nodes+i*chnode_sz
-                yield self._init_single(self,node,parent)
-
-                if full:
-                    i += 1
-                else:
-                    i += hn.desc+1
+                yield node,parent,hn
+                i += 1
 
-        return self._axis(gen,from_nodes,type=type,rel=rel)
+        return self._axis(gen,from_nodes,type=type,rel=rel,light=light)
 
-    def siblings(self, gen=False, type=reliqType.tag, full=False, rel=False) -> list['reliq']|Generator['reliq',None,None]:
+    def siblings(self, gen=False, type=reliqType.tag, full=False, rel=False, light=False) -> list['reliq']|Generator['reliq',None,None]:
         r = chain(
-            self.siblings_preceding(True,type=type,full=full,rel=rel),
-            self.siblings_subsequent(True,type=type,full=full,rel=rel),
+            self.siblings_preceding(True,type=type,full=full,rel=rel,light=light),
+            self.siblings_subsequent(True,type=type,full=full,rel=rel,light=light),
         )
         if not gen:
             r = list(r)
         return r
 
-    def __bytes__(self):
-        ret = b""
+    def _children_tags(self) -> Generator[c_void_p,None,None]:
+        if self.type is not self.Type.tag:
+            return
+        node = self.single.chnode
+        hn = self.single.hnode
+        for child, chn in self.struct.siblings(node+chnode_sz,node+(hn.desc+1)*chnode_sz,hn.lvl+1):
+            if chn.ntype is self.Type.tag:
+                yield child
+
+    @property
+    def first_child(self) -> Optional['reliq']:
+        for node in self._children_tags():
+            return self._init_single(self,node,self.single.cparent)
+        return None
+
+    @property
+    def last_child(self) -> Optional['reliq']:
+        node = None
+        for node in self._children_tags():
+            pass
+        if node is None:
+            return None
+        return self._init_single(self,node,self.single.cparent)
+
+    @property
+    def next_sibling(self) -> Optional['reliq']:
+        if self.type not in self.Type.single:
+            return None
+        struct = self.struct.struct
+        hn = self.single.hnode
+        node = self.single.chnode+(hn.desc+1)*chnode_sz
+        for node, shn in self.struct.siblings(node,struct.nodes+struct.nodesl*chnode_sz,hn.lvl):
+            if shn.ntype is self.Type.tag:
+                return self._init_single(self,node,self.single.cparent)
+        return None
 
+    @property
+    def prev_sibling(self) -> Optional['reliq']:
+        if self.type not in self.Type.single:
+            return None
+        nodes = self.struct.struct.nodes
+        parents = self.struct.parents
+        position = self.single.position
+        parent = parents[position]
+
+        i = position-1
+        while i >= 0 and i != parent:
+            p = parents[i]
+            if p != parent: # descendant of previous sibling
+                i = p
+                continue
+
+            node = nodes+i*chnode_sz
+            if self.struct.hnode(node).ntype is self.Type.tag:
+                return self._init_single(self,node,self.single.cparent)
+            i -= 1
+        return None
+
+    def __bytes__(self):
         rtype = self.type
 
         if rtype in self.Type.single:
             return bytes(self.single.hnode.all)
 
-        if rtype is self.Type.list:
-            for hnode, parent in self.compressed.iter():
-                hn = chnode_conv(self.struct.struct,hnode)
-                ret += bytes(hn)
+        if rtype not in self.Type.plural:
+            return b""
 
-            return ret
+        struct = self.struct.struct
+        if _native is not None and rtype is self.Type.struct:
+            return _native.outer(addressof(struct),struct.nodes or 0,struct.nodesl)
+        conv = libreliq.reliq_chnode_conv
+        rq = byref(struct)
+        hn = _reliq_hnode_struct()
+        hnref = byref(hn)
+        spans = []
 
-        if rtype is not self.Type.struct:
-            return ret
+        if rtype is self.Type.list:
+            for hnode, parent in self.compressed.iter():
+                conv(rq,hnode,hnref)
+                spans.append((hn.all.b,hn.all.s))
+        else:
+            nodes = struct.nodes
+            nodesl = struct.nodesl
+            i = 0
+            while i < nodesl:
+                conv(rq,nodes+i*chnode_sz,hnref)
+                spans.append((hn.all.b,hn.all.s))
+                i += hn.desc+1
 
-        nodes = self.struct.struct.nodes
-        nodesl = self.struct.struct.nodesl
-        i = 0
-        while i < nodesl:
-            hn = chnode_conv(self.struct.struct,nodes+i*chnode_sz)
-            ret += bytes(hn)
-            i += hn.desc+1
-        return ret
+        return self.data.gather(spans,self.struct)
 
     def __str__(self):
         return bytes(self).decode()
 
+    @property
+    def view(self) -> Optional[memoryview]:
+        if self.type not in self.Type.single:
+            return None
+        hn = self.single.hnode
+        return self.data.slice(hn.all.b,hn.all.s,self.struct)
+
     def _repr_short_str(self, text,mx=20):
         x = '"' + text[:mx] + '"'
         if len(text) > 20:
@@ -913,10 +1798,24 @@ class reliq():
 
         assert 0
 
-    def _name(self, raw: bool=False) -> Optional[str|bytes]:
+    def _spanconv(self, ptr: int, size: int, raw: bool) -> str|bytes|memoryview:
+        if raw and self.views:
+            if not ptr:
+                return memoryview(b'')
+            return self.data.slice(ptr,size,self.struct)
+        return strconv(string_at(ptr,size),raw)
+
+    def _strconv(self, string: _reliq_cstr_struct, raw: bool) -> str|bytes|memoryview:
+        if raw and self.views:
+            if not string.b:
+                return memoryview(b'')
+            return self.data.slice(string.b,string.s,self.struct)
+        return strconv(string,raw)
+
+    def _name(self, raw: bool=False) -> Optional[str|bytes|memoryview]:
         if self.type is not self.Type.tag:
             return None
-        return strconv(self.single.hnode.tag,raw)
+        return self._strconv(self.single.hnode.tag,raw)
 
     @property
     def ref_raw(self) -> bytes:
@@ -947,7 +1846,7 @@ class reliq():
         l = c_size_t()
         x.b = libreliq.reliq_hnode_starttag(byref(self.single.hnode),byref(l))
         x.s = l
-        return strconv(x,raw)
+        return self._strconv(x,raw)
 
     @property
     def starttag_raw(self) -> Optional[bytes]:
@@ -969,7 +1868,7 @@ class reliq():
         if x.b is None:
             return None
         x.s = l
-        return strconv(x,raw)
+        return self._strconv(x,raw)
 
     @property
     def endtag_raw(self) -> Optional[bytes]:
@@ -990,7 +1889,7 @@ class reliq():
     def _insides(self, raw: bool=False) -> Optional[str|bytes]:
         if self.type not in self.Type.tag|self.Type.comment:
             return None
-        return strconv(self.single.hnode.insides,raw)
+        return self._strconv(self.single.hnode.insides,raw)
 
     @property
     def insides(self) -> Optional[str]:
@@ -1057,40 +1956,63 @@ class reliq():
             return 0
         return self.single.hnode.attribsl
 
-    def _attrib(self, raw: bool=False) -> dict:
+    def _attribs(self, hnodes: typing.Iterable[_reliq_hnode_struct], raw: bool=False, name: Optional[str|bytes]=None) -> list[dict|Optional[str|bytes|memoryview]]:
+        # if name is set only values of that attribute are returned, otherwise dicts of all attributes
+        ret = []
+        struct = self.struct.struct
+        conv = self._spanconv
+        value_separator = strconv(" ",raw)
+        if name is not None:
+            name = strconv(name,True).lower()
+
+        for hn in hnodes:
+            attribs = {}
+            found = None
+            if hn.ntype is self.Type.tag:
+                for key, value, size in cattribs_conv(struct,hn.attribs,hn.attribsl):
+                    if name is not None:
+                        if key.lower() != name:
+                            continue
+                        value = conv(value,size,raw)
+                        if found is not None and len(found) > 0:
+                            value = value_separator.join((found,value))
+                        found = value
+                        continue
+
+                    key = strconv(key,raw).lower()
+                    value = conv(value,size,raw)
+                    prev = attribs.get(key)
+                    if prev is not None and len(prev) > 0:
+                        value = value_separator.join((prev,value))
+                    attribs[key] = value
+
+            ret.append(attribs if name is None else found)
+        return ret
+
+    def _attrib(self, raw: bool=False) -> dict|reliq_attrib:
         if self.type is not self.Type.tag:
             return {}
+        return self.single.attrib(self,raw)
 
-        ret = {}
-        length = self.single.hnode.attribsl
-        i = 0
-        attr = self.single.hnode.attribs
-
-        conv = lambda x: strconv(x,raw)
-        value_separator = conv(" ")
-
-        while i < length:
-            a = _reliq_attrib_struct()
-            libreliq.reliq_cattrib_conv(byref(self.struct.struct),attr+i*cattrib_sz,byref(a))
-
-            key = conv(a.key).lower()
-            t = conv('')
-            prev = ret.get(key)
-            if prev is not None:
-                t += ret.get(key)
-            if len(t) > 0:
-                t += value_separator
-            t += conv(a.value)
-            ret[key] = t
-            i += 1
-        return ret
+    def _attribs_many(self, raw: bool=False, name: Optional[str|bytes]=None) -> list[dict|Optional[str|bytes|memoryview]]:
+        if self._isempty:
+            return []
+        # every node is visited once so node cache is bypassed
+        struct = self.struct.struct
+        return self._attribs((chnode_conv(struct,i[0]) for i in self._getindex()),raw,name)
+
+    def attrib_values(self, name: str|bytes, raw: bool=False) -> list[Optional[str|bytes|memoryview]]:
+        return self._attribs_many(raw,name)
+
+    def attribs_many(self, raw: bool=False) -> list[dict]:
+        return self._attribs_many(raw)
 
     @property
-    def attrib(self) -> dict:
+    def attrib(self) -> dict|reliq_attrib:
         return self._attrib()
 
     @property
-    def attrib_raw(self) -> dict:
+    def attrib_raw(self) -> dict|reliq_attrib:
         return self._attrib(True)
 
     @property
@@ -1105,28 +2027,37 @@ class reliq():
         return self.single.hnode.ntype
 
     def _text(self,recursive: bool=False, raw: bool=False) -> str|bytes:
-        conv = lambda x: strconv(x,raw)
-        ret = conv('')
         if self.struct is None:
-            return ret
+            return strconv('',raw)
+
+        struct = self.struct.struct
+        if _native is not None:
+            rq = addressof(struct)
+            return strconv(b"".join([_native.text(rq,nodes or 0,nodesl,recursive) for nodes, nodesl, lvl, parent in self._elnodes()]),raw)
+
+        conv = libreliq.reliq_chnode_conv
+        rq = byref(struct)
+        hn = _reliq_hnode_struct()
+        hnref = byref(hn)
+        spans = []
 
         for nodes, nodesl, lvl, parent in self._elnodes():
             i = 0
             lvl = -1
             while i < nodesl:
-                hn = chnode_conv(self.struct.struct,nodes+i*chnode_sz)
+                conv(rq,nodes+i*chnode_sz,hnref)
                 if lvl == -1:
                     lvl = hn.lvl
 
-                if hn.ntype in self.Type.textall:
-                    ret += conv(hn)
+                if 2 <= hn.type <= 4: # text, textempty or texterr
+                    spans.append((hn.all.b,hn.all.s))
 
                 if not recursive and hn.lvl == lvl+1:
                     i += hn.desc+1
                 else:
                     i += 1
 
-        return ret
+        return strconv(self.data.gather(spans,self.struct),raw)
 
     @property
     def text(self):
@@ -1170,9 +2101,115 @@ class reliq():
 
         return strconv(ret,raw)
 
-    def get_data(self, raw: bool=False) -> bytes:
+    @classmethod
+    def from_file(cls, path: str|Path, mmap: bool=True, ref: Optional[str|bytes]=None) -> 'reliq':
+        if not mmap:
+            from pathlib import Path
+
+            return cls(Path(path),ref=ref)
+
+        with open(path,'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(b'',ref=ref)
+            data = mmaplib.mmap(f.fileno(),0,access=mmaplib.ACCESS_READ)
+        return cls(data,ref=ref)
+
+    def to_shared(self, name: Optional[str]=None) -> shared_memory.SharedMemory:
+        from multiprocessing import shared_memory
+
+        # header: is not empty, datal, nodesl, attribsl, urll followed by arrays aligned to 8 bytes
+        header = array('Q',[0]*5)
+        parts = []
+        if not self._isempty:
+            struct = self.struct.struct
+            url = bytes(struct.url.url) if struct.url.allocated else b""
+            parts = [
+                self.data.memory(self.struct)[:self.data.size],
+                memoryview((c_char*(struct.nodesl*chnode_sz)).from_address(struct.nodes or 0)).cast('B'),
+                memoryview((c_char*(struct.attribsl*cattrib_sz)).from_address(struct.attribs or 0)).cast('B'),
+                url
+            ]
+            header = array('Q',[1,len(parts[0]),struct.nodesl,struct.attribsl,len(url)])
+
+        offsets = []
+        size = len(header)*header.itemsize
+        for i in parts:
+            offsets.append(size)
+            size += (len(i)+7)&~7
+
+        shm = shared_memory.SharedMemory(name=name,create=True,size=size)
+        buf = shm.buf
+        buf[:len(header)*header.itemsize] = header.tobytes()
+        for off, i in zip(offsets,parts):
+            buf[off:off+len(i)] = i
+        del buf
+        return shm
+
+    @classmethod
+    def attach(cls, name: str) -> 'reliq':
+        load_libreliq()
+        shm = shared_attach(name)
+        header = array('Q')
+        header.frombytes(shm.buf[:5*header.itemsize])
+        if not header[0]:
+            shm.close()
+            return cls()
+
+        buf = shm.buf.toreadonly()
+
+        spans = []
+        off = len(header)*header.itemsize
+        for i in (header[1],header[2]*chnode_sz,header[3]*cattrib_sz,header[4]):
+            spans.append(buf[off:off+i])
+            off += (i+7)&~7
+
+        data = reliq_str(spans[0])
+        struct = reliq_struct.from_buffers(spans[1],spans[2],header[2],header[3],bytes(spans[3]),data)
+        # shared memory is closed after all buffers using it are released
+        for i in struct.buffers:
+            i.shared = shm
+
+        ret = cls(None)
+        ret.data = data
+        ret.struct = struct
+        return ret
+
+    def get_data(self, raw: bool=False) -> str|bytes|memoryview:
+        if raw and self.data is not None:
+            view = self.data.view
+            if view is not None:
+                return view
         return strconv(self.data,raw)
 
+    def cache_info(self) -> Optional[reliq_cache_info]:
+        if self._isempty:
+            return None
+        return self.struct.cache_info()
+
+    def __reduce__(self):
+        cls = type(self)
+        if '<locals>' in cls.__qualname__: # classes created by RQ()
+            cls = reliq
+
+        if self._isempty:
+            return (cls,())
+
+        nodes = self.struct.struct.nodes
+        compressed = None
+        if self.compressed is not None:
+            compressed = string_at(self.compressed.compressed,self.compressed.size.value*sizeof(_reliq_compressed_struct))
+        single = None
+        if self.single is not None:
+            parent = self.single.cparent
+            single = ((self.single.chnode-nodes)//chnode_sz,None if parent is None else (parent-nodes)//chnode_sz)
+
+        return (_reliq_loads,(cls,self.data,self.struct,compressed,single,self.views))
+
+    def nodes_table(self) -> Optional[reliqNodesTable]:
+        if self._isempty:
+            return None
+        return self.struct.table
+
     @staticmethod
     def _create_error(err: POINTER(_reliq_error_struct)):
         p_err = err.contents
@@ -1192,20 +2229,24 @@ class reliq():
         libreliq.reliq_std_free(err,0)
         return ret
 
-    def _convscript(self,script):
+    @classmethod
+    def _convscript(cls,script):
         if isinstance(script,reliqExpr):
             return script
-        return self.expr(script)
+        if isinstance(script,str|bytes) and getattr(cls.expr,'cache',None) is None:
+            # expressions passed as strings are compiled (and validated) once, RQ(cached=True) uses its own cache
+            script = tobytes(script)
+            return expr_cache.get((cls.expr,script),lambda: cls.expr(script))
+        return cls.expr(script)
 
     def search(self, script: typing.Union[str,bytes,Path,reliqExpr], raw: bool=False) -> str|bytes:
-        conv = lambda x: strconv(x,raw)
-        ret = conv('')
+        return self._search(self._convscript(script),lambda src, srcl: strconv(string_at(src,srcl),raw))
 
+    def _search(self, expr: reliqExpr, conv: Callable):
+        # conv gets address and size of results before they are freed
         rtype = self.type
         if rtype in self.Type.empty|self.Type.unknown:
-            return ret
-
-        expr = self._convscript(script)
+            return conv(0,0)
 
         src = c_void_p()
         srcl = c_size_t()
@@ -1237,14 +2278,17 @@ class reliq():
 
         err = libreliq.reliq_exec_str(byref(struct),input,inputl,expr.expr,byref(src),byref(srcl))
 
-        if src:
-            if not err:
-                ret = conv(string_at(src,srcl.value))
-            libreliq.reliq_std_free(src,0)
-
         if err:
+            if src:
+                libreliq.reliq_std_free(src,0)
             raise self._create_error(err)
-        return ret
+
+        if not src:
+            return conv(0,0)
+        try:
+            return conv(src.value,srcl.value)
+        finally:
+            libreliq.reliq_std_free(src,0)
 
     def _get_base(self) -> bytes:
         return self.search(r'[0] base href | "%(href)v"',raw=True)
@@ -1283,6 +2327,33 @@ class reliq():
 
         return strconv(ret,raw)
 
+    @staticmethod
+    def urljoin_many(ref: bytes|str, urls: typing.Iterable[bytes|str], raw=False) -> list[str|bytes]:
+        ref = tobytes(ref)
+
+        ref_struct = _reliq_url_struct()
+        libreliq.reliq_url_parse(ref,len(ref),None,0,False,byref(ref_struct))
+        try:
+            return urljoin_many(ref_struct,urls,raw)
+        finally:
+            libreliq.reliq_url_free(byref(ref_struct))
+
+    @staticmethod
+    def urlparse(url: bytes|str, raw=False) -> urllib.parse.ParseResult|urllib.parse.ParseResultBytes:
+        import urllib.parse
+
+        url = tobytes(url)
+        url_struct = _reliq_url_struct()
+        libreliq.reliq_url_parse(url,len(url),None,0,False,byref(url_struct))
+
+        parts = [strconv(bytes(getattr(url_struct,i)),raw) for i in urllib.parse.ParseResult._fields]
+
+        libreliq.reliq_url_free(byref(url_struct))
+
+        if raw:
+            return urllib.parse.ParseResultBytes(*parts)
+        return urllib.parse.ParseResult(*parts)
+
     def ujoin(self, url: bytes|str, raw=False) -> str|bytes:
         if self._isempty:
             return strconv("",raw)
@@ -1302,19 +2373,24 @@ class reliq():
 
         return strconv(ret,raw)
 
+    def ujoin_many(self, urls: typing.Iterable[bytes|str], raw=False) -> list[str|bytes]:
+        if self._isempty or self.struct.struct.url.allocated == 0:
+            return [strconv("",raw) for i in urls]
+        return urljoin_many(self.struct.struct.url,urls,raw)
 
-    def json(self, script: typing.Union[str,bytes,Path,reliqExpr]) -> dict:
+    def json(self, script: typing.Union[str,bytes,Path,reliqExpr], raw: bool=False, loader: Optional[Callable]=None) -> dict:
         expr = self._convscript(script)
         expr.correct_scheme()
-        return json.loads(self.search(expr,raw=True))
-
-    def filter(self,script: typing.Union[str,bytes,Path,reliqExpr],independent: bool=False) -> "reliq":
-        rtype = self.type
-        if rtype in self.Type.empty|self.Type.unknown:
-            return self
+        if loader is not None:
+            return loader(self.search(expr,raw=True))
+        return self._search(expr,lambda src, srcl: json_loads(src,srcl,raw))
 
+    def json_raw(self, script: typing.Union[str,bytes,Path,reliqExpr]) -> bytes:
         expr = self._convscript(script)
+        expr.correct_scheme()
+        return self.search(expr,raw=True)
 
+    def _exec(self, rtype: reliqType, expr: reliqExpr) -> Tuple[c_void_p,c_size_t]:
         compressed = c_void_p()
         compressedl = c_size_t()
 
@@ -1340,21 +2416,193 @@ class reliq():
 
         err = libreliq.reliq_exec(byref(struct),input,inputl,expr.expr,byref(compressed),byref(compressedl))
 
-        if compressed:
-            if not err:
-                if independent:
-                    nstruct = reliq_struct(libreliq.reliq_from_compressed_independent(compressed,compressedl,byref(struct)))
-                    data = reliq_str(nstruct.struct.data,nstruct.struct.datal)
-                    ret = self._init_independent(data,nstruct,self.ref)
+        if err:
+            if compressed:
+                libreliq.reliq_std_free(compressed,0)
+            raise self._create_error(err)
+        return compressed, compressedl
+
+    def filter(self,script: typing.Union[str,bytes,Path,reliqExpr],independent: bool=False) -> "reliq":
+        rtype = self.type
+        if rtype in self.Type.empty|self.Type.unknown:
+            return self
+
+        expr = self._convscript(script)
+
+        compressed, compressedl = self._exec(rtype,expr)
+        struct = self.struct.struct
+
+        if not compressed:
+            return self._new(None)
+
+        if independent:
+            nstruct = reliq_struct(libreliq.reliq_from_compressed_independent(compressed,compressedl,byref(struct)))
+            data = reliq_str(nstruct.struct.data,nstruct.struct.datal)
+            ret = self._init_independent(data,nstruct,self.ref)
+            ret.views = self.views
 
-                    libreliq.reliq_std_free(compressed,0)
-                else:
-                    ret = self._new(self)
-                    ret.compressed = reliq_compressed_list(struct.nodes,compressed,compressedl)
-        else:
-            ret = self._new(None)
             libreliq.reliq_std_free(compressed,0)
+        else:
+            ret = self._new(self)
+            ret.compressed = reliq_compressed_list(struct.nodes,compressed,compressedl)
+        return ret
 
-        if err:
-            raise self._create_error(err)
+    def first(self,script: typing.Union[str,bytes,Path,reliqExpr]) -> Optional["reliq"]:
+        rtype = self.type
+        if rtype in self.Type.empty|self.Type.unknown:
+            return None
+
+        expr = self._convscript(script)
+
+        compressed, compressedl = self._exec(rtype,expr)
+        if not compressed:
+            return None
+
+        ret = None
+        nodes = self.struct.struct.nodes
+        entries = cast(compressed,POINTER(_reliq_compressed_struct))
+        for i in range(compressedl.value):
+            c = entries[i]
+            if c.hnode >= UINT32_MAX-6:
+                continue
+
+            hnode = nodes+c.hnode*chnode_sz
+            parent = hnode if c.parent == UINT32_MAX else nodes+c.parent*chnode_sz
+            ret = self._init_single(self,hnode,parent)
+            break
+
+        libreliq.reliq_std_free(compressed,0)
         return ret
+
+    def exists(self,script: typing.Union[str,bytes,Path,reliqExpr]) -> bool:
+        return self.first(script) is not None
+
+    @staticmethod
+    def _run_many(func: Callable, pages: typing.Iterable, workers: Optional[int], window: Optional[int], ordered: bool) -> Generator:
+        def task(page):
+            try:
+                return func(page)
+            except Exception as e:
+                return e
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if window is None:
+            window = workers*2
+        window = max(window,1)
+
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            pending = deque() if ordered else {}
+            count = 0
+            pages = iter(pages)
+
+            def submit():
+                nonlocal count
+                for page in pages:
+                    future = executor.submit(task,page)
+                    if ordered:
+                        pending.append(future)
+                    else:
+                        pending[future] = count
+                    count += 1
+                    return True
+                return False
+
+            while len(pending) < window and submit():
+                pass
+
+            while pending:
+                if ordered:
+                    r = pending.popleft().result()
+                    submit()
+                    yield r
+                else:
+                    done, _ = wait(pending,return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = pending.pop(future)
+                        submit()
+                        yield index, future.result()
+        finally:
+            executor.shutdown(wait=True,cancel_futures=True)
+
+    @classmethod
+    def search_many(cls, pages: typing.Iterable, script: typing.Union[str,bytes,Path,reliqExpr], raw: bool=False, workers: Optional[int]=None, window: Optional[int]=None, ordered: bool=True) -> Generator:
+        expr = cls._convscript(script)
+        return cls._run_many(lambda x: cls(x).search(expr,raw=raw),pages,workers,window,ordered)
+
+    @classmethod
+    def json_many(cls, pages: typing.Iterable, script: typing.Union[str,bytes,Path,reliqExpr], raw: bool=False, loader: Optional[Callable]=None, workers: Optional[int]=None, window: Optional[int]=None, ordered: bool=True) -> Generator:
+        expr = cls._convscript(script)
+        expr.correct_scheme()
+        return cls._run_many(lambda x: cls(x).json(expr,raw=raw,loader=loader),pages,workers,window,ordered)
+
+    @staticmethod
+    def _walk_files(path: str|Path, recursive: bool) -> Generator:
+        entries = sorted(os.scandir(path),key=lambda x: x.name)
+        for i in entries:
+            if i.is_file():
+                yield i.path
+            elif recursive and i.is_dir():
+                yield from reliq._walk_files(i.path,recursive)
+
+    @classmethod
+    def extract_dir(cls, path: str|Path, script: typing.Union[str,bytes,Path,reliqExpr], out: typing.IO, workers: Optional[int]=None, window: Optional[int]=None, ordered: bool=True, recursive: bool=False, errors: bool=True, progress: Optional[Callable]=None) -> reliq_extract_stats:
+        import json
+        import io
+
+        expr = cls._convscript(script)
+        expr.correct_scheme()
+
+        def task(file):
+            size = 0
+            try:
+                size = os.stat(file).st_size
+                return file, size, cls.from_file(file).search(expr,raw=True), None
+            except Exception as e:
+                return file, size, None, e
+
+        text = isinstance(out,io.TextIOBase)
+        files = errs = inputl = outputl = 0
+        start = time.monotonic()
+
+        for r in cls._run_many(task,cls._walk_files(path,recursive),workers,window,ordered):
+            if not ordered:
+                r = r[1]
+            file, size, result, err = r
+            files += 1
+            inputl += size
+
+            if err is not None:
+                errs += 1
+                if not errors:
+                    continue
+                line = '{"file":%s,"error":%s}\n' % (json.dumps(os.fspath(file)),json.dumps("{}: {}".format(type(err).__name__,err)))
+                line = line.encode('utf-8')
+            else:
+                line = b'{"file":%s,"result":%s}\n' % (json.dumps(os.fspath(file)).encode('utf-8'),result or b'null')
+
+            outputl += len(line)
+            out.write(line.decode('utf-8','replace') if text else line)
+            if progress is not None:
+                progress(reliq_extract_stats(files,errs,inputl,outputl,time.monotonic()-start))
+
+        return reliq_extract_stats(files,errs,inputl,outputl,time.monotonic()-start)
+
+def _reliq_loads(cls: type, data: reliq_str, struct: reliq_struct, compressed: Optional[bytes], single: Optional[Tuple[int,Optional[int]]], views: bool) -> reliq:
+    load_libreliq()
+    struct.set_data(data)
+    nodes = struct.struct.nodes
+
+    ret = cls(None,views=views)
+    ret.data = data
+    ret.struct = struct
+    if compressed is not None:
+        size = len(compressed)//sizeof(_reliq_compressed_struct)
+        ret.compressed = reliq_compressed_list(nodes,(_reliq_compressed_struct*size).from_buffer_copy(compressed),c_size_t(size),owned=False)
+    if single is not None:
+        hnode, parent = single
+        ret.single = reliq_single(ret,nodes+hnode*chnode_sz,None if parent is None else nodes+parent*chnode_sz)
+    return ret
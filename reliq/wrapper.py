@@ -2,45 +2,70 @@
 # by Dominik Stanisław Suchora <hexderm@gmail.com>
 # License: GNU GPLv3
 
+from __future__ import annotations
+
 import os
-from pathlib import Path
-import inspect
-from threading import Lock
+import sys
+
+from .reliq import reliq, reliqExpr, reliqExprCache
 
-from .reliq import reliq, reliqExpr
+def RQ(path="",cached=False,maxsize: int|None=256,maxbytes: int|None=None):
+    from pathlib import Path
 
-def RQ(path="",cached=False):
-    expressions = {}
     class rq(reliq):
         pass
 
     if path[:1] != "/":
-        basepath = os.path.realpath(os.path.dirname(inspect.stack()[1].filename))
+        basepath = os.path.realpath(os.path.dirname(sys._getframe(1).f_code.co_filename))
         path = os.path.realpath(basepath + "/" + path)
     path = Path(path)
 
-    lock = Lock() if cached else None
+    cache = reliqExprCache(maxsize,maxbytes) if cached else None
+
+    def resolve(x):
+        if isinstance(x,Path):
+            s = str(x)
+            if s[:1] != '/' and s[:2] != "./" and s[:3] != '../':
+                x = Path(os.path.realpath(path / x))
+        return x
 
     class rqExpr(reliqExpr):
-        def __init__(self,script: str|bytes|Path):
-            x = script
+        def __new__(cls,script: str|bytes|Path):
+            x = resolve(script)
 
-            if isinstance(x,Path):
-                s = str(x)
-                if s[:1] != '/' and s[:2] != "./" and s[:3] != '../':
-                    x = Path(os.path.realpath(path / x))
+            if cache is None:
+                return cls._compile(x)
 
-            if not cached:
-                return super().__init__(x)
+            stamp = None
+            if isinstance(x,Path):
+                st = os.stat(x)
+                stamp = (st.st_mtime_ns,st.st_size)
+            return cache.get(x,lambda: cls._compile(x),stamp)
 
-            r = expressions.get(x)
-            if r is not None:
-                return r
+        def __init__(self,script: str|bytes|Path):
+            # compiled in __new__
+            pass
 
-            expr = super().__init__(x)
-            with lock:
-                expressions[x] = expr
+        @classmethod
+        def _compile(cls,script: str|bytes|Path):
+            expr = object.__new__(cls)
+            reliqExpr.__init__(expr,script)
             return expr
 
+        @classmethod
+        def precompile(cls,*scripts: str|bytes|Path) -> list[reliqExpr]:
+            if cache is None:
+                raise ValueError("precompile() called without cache, set cached=True in RQ()")
+            ret = []
+            for i in scripts:
+                i = resolve(i)
+                if isinstance(i,Path) and i.is_dir():
+                    ret += cls.precompile(*sorted(j for j in i.iterdir() if j.is_file()))
+                    continue
+                ret.append(cls(i))
+            return ret
+
+    rqExpr.cache = cache
+
     rq.expr = rqExpr
     return rq
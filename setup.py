@@ -1,7 +1,8 @@
 import os
+import sys
 import subprocess
 import platform
-from setuptools import setup
+from setuptools import setup, Extension
 from setuptools.dist import Distribution
 from setuptools.command.bdist_wheel import bdist_wheel
 from setuptools.command.build import build
@@ -51,6 +52,13 @@ class Build(build):
 
 
 class BdistWheel(bdist_wheel):
+    def run(self):
+        # the same build is retagged for every python version, compiled extension
+        # works only with interpreter that built it so other wheels go without it
+        if self.python_tag != "cp{}{}".format(*sys.version_info[:2]):
+            self.distribution.ext_modules = []
+        super().run()
+
     def get_tag(self):
         tags = super().get_tag()
 
@@ -73,6 +81,10 @@ class BdistWheel(bdist_wheel):
 
 setup(
     distclass=BinaryDistribution,
+    ext_modules=[
+        # reliq works without it, it only speeds up loops over nodes
+        Extension("reliq._native", ["reliq/_native.c"], optional=True)
+    ],
     cmdclass={
         "build": Build,
         "bdist_wheel": BdistWheel,
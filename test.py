@@ -6,8 +6,10 @@ import time
 import resource
 import json
 import gc
+import pickle
+import subprocess
 from ctypes import *
-from reliq import reliq
+from reliq import reliq, RQ
 from memory_profiler import profile
 from functools import lru_cache
 from typing import Generator
@@ -354,5 +356,699 @@ def test_basic():
 
     assert reliq('<base href="/loop" >',ref="https://g.xyz/").ref == 'https://g.xyz/loop'
 
+def test_nodes_table():
+    rq = reliq(html_data)
+    t = rq.nodes_table()
+
+    assert len(t) == rq.struct.struct.nodesl
+    assert t is rq.filter('li').nodes_table()
+    assert reliq().nodes_table() is None
+
+    for i in rq.everything(True,type=None):
+        pos = i.position
+        assert t.lvl[pos] == i.lvl
+        assert t.desc(pos) == i.single.hnode.desc
+        assert html_data[t.all_off[pos]:t.all_off[pos]+t.all_len[pos]] == bytes(i)
+        if i.type is reliq.Type.tag:
+            assert html_data[t.tag_off[pos]:t.tag_off[pos]+t.tag_len[pos]] == i.name_raw
+            assert t.attribsl[pos] == i.attribl
+
+def test_index():
+    rq = reliq(html_data)
+    x = rq.filter('li')
+    s = rq[0]
+
+    for i in (rq,x,s):
+        l = len(i)
+        assert l == len(i.self() if i.type is not reliq.Type.tag else i.children())
+        assert [j.position for j in i] == [i[j].position for j in range(l)]
+        assert i[-1].position == i[l-1].position
+        assert [j.position for j in i[1:-1]] == [i[j].position for j in range(1,l-1)]
+        assert i[1:-1].type is reliq.Type.list or l < 3
+        for a, b in ((0,l),(1,l-1),(2,l)):
+            part = i[a:b]
+            for j in range(a,b):
+                x1, x2 = i[j], part[j-a]
+                assert (x1.position,x1.rposition,x1.lvl,x1.rlvl) == (x2.position,x2.rposition,x2.lvl,x2.rlvl)
+        assert [j.rposition for j in i[::2][::1]] == [i[j].rposition for j in range(0,l,2)]
+
+    assert len(x[::2]) == (len(x)+1)//2
+    assert x[len(x):].type is reliq.Type.empty
+    try:
+        x[len(x)]
+    except IndexError:
+        pass
+    else:
+        assert 0
+
+    for i in (reliq(''),reliq(bytearray())):
+        assert len(i) == 0
+        assert list(i) == []
+        assert i[:].type is reliq.Type.empty
+        assert i.attribs_many() == []
+        assert i.attrib_values('href') == []
+        try:
+            i[0]
+        except IndexError:
+            pass
+        else:
+            assert 0
+
+def test_many_docs():
+    pages = [html_data,'<title>T</title>','<div>'*8193,html_data]
+    expr = r'.t [0] title | "%i"'
+
+    r = list(reliq.json_many(pages,expr,workers=2,window=1))
+    assert r[0] == reliq(html_data).json(expr)
+    assert r[1] == {'t':'T'}
+    assert isinstance(r[2],reliq.HtmlError)
+    assert r[3] == r[0]
+
+    r = dict(reliq.search_many(pages,expr,raw=True,workers=3,ordered=False))
+    assert sorted(r.keys()) == [0,1,2,3]
+    assert r[1] == b'{"t":"T"}'
+
+    try:
+        reliq.json_many(pages,'.r li, .r a')
+    except reliq.ScriptError:
+        pass
+    else:
+        assert 0
+
+def test_buffers():
+    expr = r'a | "%(href)v\n"'
+    model = reliq(html_data).search(expr)
+
+    b = bytearray(html_data)
+    rq = reliq(b)
+    assert rq.search(expr) == model
+    assert isinstance(rq.get_data(True),memoryview)
+    assert rq.get_data(True) == html_data
+    assert rq.get_data() == html_data.decode()
+    try:
+        b.append(0)
+    except BufferError:
+        pass
+    else:
+        assert 0
+
+    rq = reliq(memoryview(html_data)[10:])
+    assert str(rq) == html_data[10:].decode()
+
+    rq = reliq.from_file("index.html")
+    assert rq.search(expr) == model
+    assert rq.get_data(True) == html_data
+    assert reliq.from_file("index.html",mmap=False).get_data(True) == html_data
+
+def test_views():
+    rq = reliq(html_data)
+
+    for i in (rq,rq.filter('ul',True)):
+        v = reliq(i,views=True)
+        for a, b in zip(i.everything(True,type=None),v.everything(True,type=None)):
+            assert isinstance(b.view,memoryview)
+            assert b.view == bytes(a)
+            for j in ('name_raw','starttag_raw','endtag_raw','endtag_strip_raw','insides_raw'):
+                x = getattr(a,j)
+                y = getattr(b,j)
+                assert (x is None and y is None) or (isinstance(y,memoryview) and x == y)
+            assert a.attrib_raw == {k: bytes(l) for k, l in b.attrib_raw.items()}
+            assert a.name == b.name
+            assert a.attrib == b.attrib
+
+    assert rq.filter('a')[0].view is not None
+    assert rq.view is None
+
+def test_gather():
+    rq = reliq('<p>a<b>b</b>c</p>x'*3)
+    assert rq.text == 'acxacxacx'
+    assert rq.text_recursive == 'abcxabcxabcx'
+    assert rq.filter('p').text == 'acacac'
+    assert rq[1].text_recursive_raw == b'abc'
+
+    rq = reliq(html_data)
+    for i in (rq,rq.filter('li'),rq[0],rq.filter('ul',True)):
+        assert bytes(i) == b''.join(bytes(j) for j in i.self(True,type=None))
+        assert str(i) == ''.join(str(j) for j in i.self(True,type=None))
+        assert i.text_recursive_raw == b''.join(bytes(j) for j in i.full(True,type=reliq.Type.textall))
+
+def test_node_cache():
+    rq = reliq(html_data)
+    assert reliq().cache_info() is None
+
+    model = [[j.position for j in i.ancestors()] for i in rq.filter('li')]
+    info = rq.cache_info()
+    assert info.misses == info.currsize
+    assert info.currsize <= info.maxsize
+
+    assert [[j.position for j in i.ancestors()] for i in rq.filter('li')] == model
+    info2 = rq.cache_info()
+    assert info2.misses == info.misses
+    assert info2.hits > info.hits
+
+    # walks over many nodes don't go through cache
+    rq = reliq(html_data)
+    for i in (rq.descendants(),rq.everything(),rq.children(),rq.full(),len(rq)):
+        pass
+    assert rq.cache_info().currsize == 0
+    assert [i.name for i in rq.full()] == [i.name for i in rq.everything()]
+
+    # least recently used nodes are evicted
+    rq = reliq(html_data)
+    struct = rq.struct
+    nodes = [struct.struct.nodes+i*sys.modules['reliq.reliq'].chnode_sz for i in range(3)]
+    struct.cache_size = 2
+    for i in (0,1,0,2):
+        struct.hnode(nodes[i])
+    assert list(struct._hnodes) == [nodes[0],nodes[2]]
+
+def test_parents():
+    rq = reliq(html_data)
+    y = rq.everything(type=None)
+
+    assert y[0].parent() == []
+    assert y[0].ancestors() == []
+    assert y[0].preceding(type=None) == []
+
+    for i in y:
+        anc = i.ancestors(type=None)
+        assert [j.lvl for j in anc] == list(range(i.lvl-1,-1,-1))
+        if len(anc) > 0:
+            assert i.parent(type=None)[0].position == anc[0].position
+            assert anc[0].position < i.position <= anc[0].position+anc[0].desc_count
+
+        ancpos = set(j.position for j in anc)
+        assert [j.position for j in i.preceding(type=None)] == [j for j in range(i.position-1,-1,-1) if j not in ancpos]
+
+    # index is the same whether it's built from levels of nodes or of existing table
+    parents = rq.struct.parents
+    rq = reliq(html_data)
+    rq.nodes_table()
+    assert rq.struct.parents == parents
+    assert len(reliq('').struct.parents) == 0
+
+    # only levels of nodes are needed, not the whole table
+    rq = reliq(html_data)
+    li = rq.filter('li')[2]
+    assert li.prev_sibling is not None and li.parent() != []
+    assert rq.struct._table is None
+
+def test_parser():
+    expr = r'a | "%(href)v\n"'
+    model = reliq(html_data).search(expr)
+
+    for hint in (0,100,len(html_data),len(html_data)*2):
+        p = reliq.Parser(size_hint=hint)
+        for i in range(0,len(html_data),1000):
+            p.feed(html_data[i:i+1000])
+        rq = p.close()
+        assert rq.search(expr) == model
+        assert rq.get_data(True) == html_data
+
+        try:
+            p.feed(b'<p>')
+        except ValueError:
+            pass
+        else:
+            assert 0
+
+    p = reliq.Parser(ref="https://wikipedia.org")
+    p.feed('<a href="index.html">')
+    p.feed(b'k</a>')
+    rq = p.close()
+    assert rq.ref == "https://wikipedia.org"
+    assert str(rq) == '<a href="index.html">k</a>'
+
+def test_first():
+    rq = reliq(html_data)
+
+    for i in (rq,rq.filter('ul'),rq.filter('ul')[1]):
+        for j in ('li','[0] a','text@ *','ul; a','nothing'):
+            r = i.first(j)
+            l = i.filter(j)
+            assert i.exists(j) == (r is not None)
+            if r is None:
+                assert len(l) == 0
+                continue
+            assert r.position == l[0].position
+            assert r.rposition == l[0].rposition
+
+    assert reliq().first('li') is None
+    assert not reliq().exists('li')
+
+def test_rq_cache():
+    rq = RQ(cached=True,maxsize=2)
+    assert rq.expr('li') is rq.expr('li')
+    assert isinstance(rq.expr('li'),reliq.expr)
+    rq.expr('a')
+    rq.expr('p')
+    info = rq.expr.cache.info()
+    assert info.currsize == 2
+    assert info.evictions == 1
+    assert info.hits == 2
+    assert rq(html_data).search('li') == reliq(html_data).search('li')
+
+    rq = RQ(cached=True,maxbytes=4)
+    rq.expr('li')
+    rq.expr('ul')
+    rq.expr('div')
+    assert rq.expr.cache.info().currsize == 1
+
+    rq = RQ()
+    assert rq.expr('li') is not rq.expr('li')
+    assert rq.expr.cache is None
+
+    assert RQ(cached=True).expr.cache.info().maxsize == 256
+
+    import threading
+    cache = reliq.ExprCache()
+    started = threading.Event()
+    release = threading.Event()
+    def slow():
+        started.set()
+        release.wait(5)
+        return reliq.expr('li')
+    t = threading.Thread(target=cache.get,args=('li',slow))
+    t.start()
+    started.wait(5)
+    # other expressions don't wait for compilation of 'li'
+    a = cache.get('a',lambda: reliq.expr('a'))
+    inserted = cache.get('li',lambda: reliq.expr('li'))
+    release.set()
+    t.join()
+    assert cache.get('li',lambda: None) is inserted
+    assert cache.get('a',lambda: None) is a
+    info = cache.info()
+    assert info.currsize == 2 and info.misses == 3 and info.hits == 2
+
+def test_precompile():
+    rq = RQ(cached=True)
+    exprs = rq.expr.precompile('li','a href',b'li')
+    assert len(exprs) == 3
+    assert rq.expr.cache.info().misses == 3
+    assert rq.expr('li') is exprs[0]
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if rq.expr('a href') is exprs[1] and rq.expr.cache.info().misses == 3 else 1)
+    assert os.waitpid(pid,0)[1] == 0
+
+    try:
+        RQ().expr.precompile('li')
+        assert 0
+    except ValueError:
+        pass
+
+    import weakref
+    rq = RQ(cached=True)
+    assert rq.expr.cache in sys.modules['reliq.reliq'].expr_caches
+    ref = weakref.ref(rq.expr.cache)
+    del rq
+    gc.collect()
+    assert ref() is None
+
+def test_pickle():
+    expr = r'a | "%(href)v %n\n"'
+    rq = reliq(html_data,ref="https://wikipedia.org")
+    objs = [rq,rq.filter('li'),rq[0][1],rq.filter('li')[3],rq.filter('ul',True),reliq(),reliq(bytearray(html_data)),rq.filter('ul',True)[1],RQ()(html_data)]
+
+    for i in objs:
+        r = pickle.loads(pickle.dumps(i))
+        assert type(r) is reliq
+        assert repr(r) == repr(i)
+        assert bytes(r) == bytes(i)
+        assert r.ref == i.ref
+        assert r.search(expr) == i.search(expr)
+        assert [repr(j) for j in r.everything()] == [repr(j) for j in i.everything()]
+        assert [(j.rposition,j.position) for j in r.descendants()] == [(j.rposition,j.position) for j in i.descendants()]
+
+    nodes = pickle.loads(pickle.dumps(list(rq.filter('li'))))
+    assert len({id(i.struct) for i in nodes}) == 1
+    assert [i.text_recursive for i in nodes] == [i.text_recursive for i in rq.filter('li')]
+
+def test_shared():
+    expr = r'a | "%(href)v %n\n"'
+    rq = reliq(html_data,ref="https://wikipedia.org")
+    shm = rq.to_shared()
+
+    pid = os.fork()
+    if pid == 0:
+        r = reliq.attach(shm.name)
+        os._exit(0 if r.search(expr) == rq.search(expr) and r.ref == rq.ref else 1)
+    assert os.waitpid(pid,0)[1] == 0
+
+    code = (
+        "import sys\n"
+        "from reliq import reliq\n"
+        "r = reliq.attach(sys.argv[1])\n"
+        "sys.stdout.write(r.search(sys.argv[2]))\n"
+    )
+    r = subprocess.run([sys.executable,'-c',code,shm.name,expr],capture_output=True)
+    assert r.returncode == 0 and r.stdout.decode() == rq.search(expr) and r.stderr == b''
+
+    r = reliq.attach(shm.name)
+    li = r.filter('li')
+    del r
+    assert str(li) == str(rq.filter('li'))
+    del li
+    shm.close()
+    shm.unlink()
+
+    shm = reliq().to_shared()
+    assert repr(reliq.attach(shm.name)) == '<reliq Empty>'
+    shm.close()
+    shm.unlink()
+
+    for i in (reliq(''),rq.filter('li')[1]):
+        shm = i.to_shared()
+        r = reliq.attach(shm.name)
+        assert r.get_data(True) == i.get_data(True)
+        assert r.search(expr) == reliq(i.get_data(True)).search(expr)
+        del r
+        shm.close()
+        shm.unlink()
+
+def test_attrib_values():
+    rq = reliq(html_data)
+    for obj in (rq,rq.filter('a'),rq.filter('li'),rq.filter('li')[2],rq.filter('( a )( text@ * )')):
+        attribs = [i.attrib for i in obj]
+        assert obj.attribs_many() == attribs
+        assert obj.attribs_many(True) == [i.attrib_raw for i in obj]
+        for name in ('href','ID','class'):
+            assert obj.attrib_values(name) == [i.get(name.lower()) for i in attribs]
+            assert obj.attrib_values(name.encode(),True) == [i.attrib_raw.get(name.lower().encode()) for i in obj]
+
+    r = reliq('<a href=x HREF=y><a href="" href=z><b>').filter('a, b')
+    assert r.attrib_values('href') == ['x y','z',None]
+    assert reliq().attrib_values('href') == []
+
+def test_attrib_lazy():
+    r = reliq('<a href=x HREF=y Class="" class=k data-x>t</a>')[0]
+    a = r.attrib
+    assert a is r.attrib
+    assert a == {'href':'x y','class':'k','data-x':''}
+    assert a['HREF'] == 'x y'
+    assert 'Class' in a and 'id' not in a and 1 not in a and None not in a
+    assert a.get(b'data-x') == '' and a.get(1) is None and a.get(1,'d') == 'd'
+    assert isinstance(a,dict) and json.loads(json.dumps(a)) == a
+    assert pickle.loads(pickle.dumps(a)) == a
+    try:
+        a[1]
+    except KeyError:
+        pass
+    else:
+        assert 0
+    assert list(a) == ['href','class','data-x']
+    for f in (lambda: a.pop('href'),lambda: a.__setitem__('HREF','x'),lambda: a.update(x='1'),lambda: a.setdefault('x'),lambda: a.clear()):
+        try:
+            f()
+        except TypeError:
+            pass
+        else:
+            assert 0
+    assert r.attrib == {'href':'x y','class':'k','data-x':''}
+    b = dict(a)
+    b['href'] = 'z'
+    assert a['href'] == 'x y' and a.copy() == a and {**a} == a
+
+    # values are decoded only when requested
+    a = reliq('<a href=x class=k>t</a>')[0].attrib
+    gc.collect()
+    assert a['href'] == 'x'
+    assert dict.__getitem__(a,'class') is None
+    assert json.dumps(a) == '{"href": "x", "class": "k"}' and len(a) == 2
+    assert reliq('<a class=k>')[0].attrib == reliq('<a CLASS=k>')[0].attrib
+    assert reliq('<a class=k>')[0].attrib != reliq('<a class=j>')[0].attrib
+    assert r.attrib_raw == {b'href':b'x y',b'class':b'k',b'data-x':b''}
+    assert r.attrib_raw['CLASS'] == b'k'
+
+    r.views = True
+    assert bytes(r.attrib_raw[b'class']) == b'k'
+    assert reliq('text').attrib == {}
+
+    links = reliq(html_data).filter('a')
+    assert [dict(i.attrib) for i in links] == links.attribs_many()
+    assert [i.attrib_raw.get('HREF') for i in links] == links.attrib_values('href',True)
+
+def test_navigation():
+    def pos(x):
+        return None if x is None else x.position
+
+    rq = reliq(html_data)
+    for i in rq.everything(type=None):
+        children = i.children()
+        assert pos(i.first_child) == (children[0].position if children else None)
+        assert pos(i.last_child) == (children[-1].position if children else None)
+        sibling = i.siblings_subsequent()
+        assert pos(i.next_sibling) == (sibling[0].position if sibling else None)
+        sibling = i.siblings_preceding()
+        assert pos(i.prev_sibling) == (sibling[0].position if sibling else None)
+
+    assert rq.first_child is None and rq.next_sibling is None
+    assert reliq().last_child is None and reliq().prev_sibling is None
+
+    r = reliq('<ul><li>1</li> t <!-- c --><li>2<b>x</b></li></ul>')[0]
+    assert r.first_child.text == '1'
+    assert r.last_child.text == '2'
+    assert r.first_child.next_sibling.text == '2'
+    assert r.last_child.prev_sibling.text == '1'
+    assert r.last_child.first_child.name == 'b'
+
+    for i in (reliq(''),reliq(bytearray())):
+        assert i.self() == [] and i.children() == [] and i.self(type=None) == []
+        assert i.first_child is None and i.last_child is None
+
+    r = reliq('<a></a> t')
+    assert r[0].siblings_subsequent() == [] and len(r[0].siblings_subsequent(type=None)) == 1
+
+def test_light():
+    props = ('type','position','rposition','lvl','rlvl','name','name_raw','attrib','attrib_raw','attribl','desc_count','text','insides')
+    rq = reliq(html_data)
+    for obj in (rq,rq.filter('li')[3],rq.filter('ul',True)[0]):
+        for axis in ('children','descendants','everything','ancestors','before','subsequent','siblings'):
+            for t in (reliq.Type.tag,None):
+                full = getattr(obj,axis)(type=t)
+                light = getattr(obj,axis)(type=t,light=True)
+                assert len(full) == len(light)
+                for i, j in zip(full,light):
+                    assert isinstance(j,reliq.Node)
+                    for p in props:
+                        assert getattr(i,p) == getattr(j,p)
+                    assert bytes(i) == bytes(j)
+                    assert repr(i) == repr(j)
+
+    node = rq.everything(light=True)[5]
+    assert node.expand() is node.expand()
+    full = rq.everything()[5]
+    for axis in ('parent','children','descendants','ancestors','siblings','before','subsequent'):
+        assert [str(i) for i in getattr(node,axis)()] == [str(i) for i in getattr(full,axis)()]
+        assert [str(i) for i in getattr(node,axis)(light=True)] == [str(i) for i in getattr(full,axis)()]
+    assert str(node.next_sibling) == str(full.next_sibling)
+    assert node.filter('li').text_recursive == full.filter('li').text_recursive
+    assert str(pickle.loads(pickle.dumps(node))) == str(node)
+    assert node.search('* | "%n"') == node.expand().search('* | "%n"')
+    assert reliq().everything(light=True) == []
+
+def test_native():
+    module = sys.modules['reliq.reliq']
+    native = module._native
+    if native is None:
+        return
+
+    def results():
+        rq = reliq(html_data)
+        return (
+            [getattr(rq.nodes_table(),i).tobytes() for i in module.reliqNodesTable.columns],
+            bytes(rq),
+            rq.text,
+            rq.text_recursive_raw,
+            rq.filter('li').text_recursive,
+            rq[0].text,
+            rq.filter('a').attribs_many(),
+            [dict(i.attrib) for i in rq.filter('*')],
+            [[j.position for j in i.children(type=None)] for i in rq.filter('*')],
+            [i.position for i in rq.self()],
+            rq.struct.parents.tobytes(),
+            [(i.text, i.text_recursive, bytes(i), i.self(), i.children()) for i in (reliq(''),reliq(bytearray()))],
+        )
+
+    fast = results()
+    assert fast[-1] == [('','',b'',[],[])]*2
+    try:
+        module._native = None
+        assert results() == fast
+    finally:
+        module._native = native
+
+def test_json_raw():
+    module = sys.modules['reliq.reliq']
+    native = module._native
+    rq = reliq(html_data)
+    expr = r"""
+        .title [0] title | "%i",
+        .links a; {
+            .href.U @ | "%(href)v",
+            .class @ | "%(class)v",
+            .text @ | "%Dt"
+        } |,
+        .ids.a.u div | "%(id)v\n" sed "s/i//",
+        .empty.N nothing | "",
+        .esc.s [0] title | "\"\\ \t \x01 \xc5\xbc"
+    """
+
+    expected = json.loads(rq.search(expr))
+    for ext in (native, None):
+        module._native = ext
+        try:
+            r = rq.json(expr)
+            assert r == expected
+            raw = rq.json(expr,raw=True)
+            assert raw['title'] == expected['title'].encode('utf-8')
+            assert raw['esc'] == expected['esc'].encode('utf-8')
+            assert raw['links'][0]['href'] == expected['links'][0]['href'].encode('utf-8')
+            assert raw['ids'] == expected['ids'] and raw['empty'] is None
+            assert list(reliq.json_many([html_data,b'<title>x</title>'],expr,raw=True,workers=2))[0] == raw
+        finally:
+            module._native = native
+
+def test_json_loader():
+    rq = reliq(html_data)
+    expr = '.title [0] title | "%i", .links.a a | "%(href)v\n"'
+
+    data = rq.json_raw(expr)
+    assert isinstance(data,bytes)
+    assert json.loads(data) == rq.json(expr)
+    assert rq.json(expr,loader=json.loads) == rq.json(expr)
+    assert rq.json(expr,loader=lambda x: x) == data
+    assert list(reliq.json_many([html_data],expr,loader=len)) == [len(data)]
+
+    try:
+        rq.json_raw('title | "%i"')
+    except reliq.ScriptError:
+        pass
+    else:
+        assert 0
+
+def test_extract_dir():
+    import io
+    import tempfile
+
+    class failing(reliq):
+        @classmethod
+        def from_file(cls, path, **kwargs):
+            if path.endswith('bad.html'):
+                raise ValueError('bad file')
+            return super().from_file(path,**kwargs)
+
+    with tempfile.TemporaryDirectory() as d:
+        for i in range(20):
+            with open(os.path.join(d,'{:02}.html'.format(i)),'w') as f:
+                f.write('<title>t{}</title>'.format(i))
+        with open(os.path.join(d,'bad.html'),'w') as f:
+            f.write('<title></title>')
+        os.mkdir(os.path.join(d,'sub'))
+        with open(os.path.join(d,'sub','x.html'),'w') as f:
+            f.write('<title>x</title>')
+
+        expr = '.title [0] title | "%i"'
+
+        out = io.BytesIO()
+        stats = failing.extract_dir(d,expr,out,workers=3,window=2)
+        lines = [json.loads(i) for i in out.getvalue().splitlines()]
+        assert stats.files == 21 and stats.errors == 1 and stats.output == len(out.getvalue())
+        assert [i['result']['title'] for i in lines[:20]] == ['t{}'.format(i) for i in range(20)]
+        assert lines[20]['error'] == 'ValueError: bad file'
+
+        out = io.StringIO()
+        stats = failing.extract_dir(d,expr,out,ordered=False,recursive=True,errors=False)
+        lines = [json.loads(i) for i in out.getvalue().splitlines()]
+        assert stats.files == 22 and len(lines) == 21
+        assert sorted(i['result']['title'] for i in lines) == sorted(['t{}'.format(i) for i in range(20)]+['x'])
+
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as out:
+            r = subprocess.run([sys.executable,'-m','reliq',expr,d,'-o',out.name,'-s'],capture_output=True)
+            assert r.returncode == 0 and b'21 files, 0 errors' in r.stderr
+            assert len(out.read().splitlines()) == 21
+
+def test_expr_cache():
+    cache = sys.modules['reliq.reliq'].expr_cache
+    rq = reliq(html_data)
+    expr = '.title [0] title | "%i", .count.u [0] li | "%i"'
+
+    hits = cache.info().hits
+    r = [rq.json(expr) for i in range(10)]
+    assert all(i == r[0] for i in r)
+    assert cache.info().hits-hits >= 9
+    assert rq.filter(expr.encode()) is not None
+    assert (reliq.expr,expr.encode()) in cache.entries
+
+    cached = RQ(cached=True)
+    hits = cache.info().hits
+    cached(html_data).search('li')
+    cached(html_data).search('li')
+    assert cache.info().hits == hits and cached.expr.cache.info().hits == 1
+
+def test_urls():
+    module = sys.modules['reliq.reliq']
+    native = module._native
+
+    rq = reliq(html_data,ref="https://wikipedia.org/wiki/page")
+    urls = [i.attrib['href'] for i in rq.filter('a')]+['index.html/../name','//x.org/p','?q#f','',b'../b']
+    ref = 'https://a.b/c/d'
+
+    for ext in (native, None):
+        module._native = ext
+        try:
+            assert rq.ujoin_many(urls) == [rq.ujoin(i) for i in urls]
+            assert rq.ujoin_many(iter(urls),raw=True) == [rq.ujoin(i,raw=True) for i in urls]
+            assert reliq.urljoin_many(ref,urls) == [reliq.urljoin(ref,i) for i in urls]
+            assert reliq.urljoin_many(ref.encode(),[],True) == []
+            assert reliq().ujoin_many(['a',b'b']) == ['','']
+        finally:
+            module._native = native
+
+    u = reliq.urlparse('https://user@ex.com:80/a/b;p?q=1#frag')
+    assert tuple(u) == ('https','user@ex.com:80','/a/b','p','q=1','frag')
+    assert u.hostname == 'ex.com' and u.port == 80
+    assert reliq.urlparse('//x.org/p?q',raw=True) == (b'',b'x.org',b'/p',b'',b'q',b'')
+    assert reliq.urlparse('').geturl() == ''
+
+def test_lazy_import():
+    code = (
+        "import sys, reliq\n"
+        "m = sys.modules['reliq.reliq']\n"
+        "assert type(m.libreliq) is m.reliq_lib\n"
+        "for i in ('json','pathlib','typing','inspect','concurrent.futures','multiprocessing'):\n"
+        "    assert i not in sys.modules, i\n"
+        "assert reliq.reliq('<p>a</p>').search('p | \"%i\"') == 'a'\n"
+        "assert type(m.libreliq) is not m.reliq_lib\n"
+    )
+    subprocess.run([sys.executable,"-c",code],check=True)
+
 print_run_many(test_many,1)
 print_run_many(test_basic,1)
+print_run_many(test_nodes_table,1)
+print_run_many(test_index,1)
+print_run_many(test_many_docs,1)
+print_run_many(test_buffers,1)
+print_run_many(test_views,1)
+print_run_many(test_gather,1)
+print_run_many(test_node_cache,1)
+print_run_many(test_parents,1)
+print_run_many(test_parser,1)
+print_run_many(test_first,1)
+print_run_many(test_rq_cache,1)
+print_run_many(test_precompile,1)
+print_run_many(test_pickle,1)
+print_run_many(test_shared,1)
+print_run_many(test_attrib_values,1)
+print_run_many(test_attrib_lazy,1)
+print_run_many(test_navigation,1)
+print_run_many(test_light,1)
+print_run_many(test_native,1)
+print_run_many(test_lazy_import,1)
+print_run_many(test_json_raw,1)
+print_run_many(test_json_loader,1)
+print_run_many(test_extract_dir,1)
+print_run_many(test_expr_cache,1)
+print_run_many(test_urls,1)